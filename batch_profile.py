@@ -0,0 +1,222 @@
+import argparse
+import datetime
+import json
+import os
+import re
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+from connector import CONNECTION_SPECS, get_connection_pool, close_connection_pool
+from data_fetch import iter_cursor_batches, arrow_to_frame
+from sql_builder import build_columns_query, build_tables_query
+from profile_stats import build_profile_query, profile_from_aggregates, supports_profile_pushdown
+from incremental_profile import (
+    PROFILE_STATE_DIR,
+    profile_state_path,
+    load_or_create_state,
+    incremental_query,
+    merge_batches
+)
+
+# Headless profiling of many tables from one connection, without Streamlit.
+# Every table is profiled by one aggregate query pushed down to the database
+# (as the UI's "Profile in database" path), so only the statistics travel.
+#
+#   python batch_profile.py teradata --schema SALES --output profiles/
+#   python batch_profile.py azuresql --credentials creds.json --connection prod \
+#       --tables dbo.orders dbo.customers --output profiles/
+#
+# Credentials come from a JSON file ({"<connection>": {"host": ..., ...}} or a
+# single flat object) or from DUA_<SOURCE>_<CONNECTION>_<KEY> environment
+# variables, e.g. DUA_TERADATA_DEFAULT_HOST. Writes one JSON file per table,
+# profiles.parquet (one row per table and column) and summary.json.
+#
+# With --watermark-column each table keeps a mergeable profile state in
+# --state-dir and a run fetches only the rows past the stored watermark,
+# instead of aggregating the whole table again:
+#   python batch_profile.py teradata --schema SALES --watermark-column LOAD_TS --output profiles/
+
+# Profiling queries in flight per connection; the connection pool is sized to match
+BATCH_CONCURRENCY = 4
+CREDENTIALS_ENV_PREFIX = "DUA"
+
+def load_credentials(source_type: str, conn_name="default", path=None, env_prefix=CREDENTIALS_ENV_PREFIX) -> dict:
+    label, keys, _ = CONNECTION_SPECS[source_type]
+    if path:
+        with open(path) as f:
+            saved = json.load(f)
+        creds = saved[conn_name] if isinstance(saved.get(conn_name), dict) else saved
+    else:
+        creds = {key: os.environ.get(f"{env_prefix}_{source_type}_{conn_name}_{key}".upper()) for key in keys}
+    missing = [key for key in keys if not creds.get(key)]
+    if missing:
+        raise ValueError(f"Missing {label} credentials for '{conn_name}': {', '.join(missing)}")
+    return {key: creds[key] for key in keys}
+
+# Stream a query on a pooled connection as Arrow record batches
+def iter_pool_batches(pool, query: str, params=None):
+    conn = pool.acquire()
+    try:
+        cursor = conn.cursor()
+        try:
+            if params:
+                cursor.execute(query, params)
+            else:
+                cursor.execute(query)
+            yield from iter_cursor_batches(cursor, as_arrow=True)
+        finally:
+            cursor.close()
+    finally:
+        pool.release(conn)
+
+# Run a query on a pooled connection and return the whole result
+def run_query(pool, query: str, params=None) -> pd.DataFrame:
+    tables = [pa.Table.from_batches([batch]) for batch in iter_pool_batches(pool, query, params)]
+    return arrow_to_frame(pa.concat_tables(tables, promote_options="permissive"))
+
+def list_schema_tables(pool, source_type: str, schema: str) -> list:
+    query, params = build_tables_query(source_type, schema)
+    return [f"{schema}.{name}" for name in run_query(pool, query, params)["TableName"]]
+
+# Per-column profile of one table and its row count
+def profile_table(pool, source_type: str, table_name: str, sample=None):
+    if not supports_profile_pushdown(source_type, sample):
+        raise ValueError(f"Sample {sample!r} cannot be profiled in the database for {source_type}")
+    query, params = build_columns_query(source_type, table_name)
+    columns_df = run_query(pool, query, params)
+    if columns_df.empty:
+        raise ValueError(f"Table {table_name} not found or has no columns")
+    aggregates = run_query(pool, build_profile_query(source_type, table_name, columns_df, sample)).iloc[0]
+    profile = profile_from_aggregates(aggregates, columns_df)
+    profile.insert(0, "data_type", columns_df["DataType"].astype(str).str.strip().to_numpy())
+    return profile, int(aggregates["row_count"])
+
+# Profile from the table's stored state, after merging the rows past its
+# watermark; the state is saved only once every new row was merged
+def profile_table_incrementally(pool, source_type: str, table_name: str, watermark_column: str, state_path: str):
+    columns_query, columns_params = build_columns_query(source_type, table_name)
+    state = load_or_create_state(state_path, source_type, watermark_column,
+                                 lambda: run_query(pool, columns_query, columns_params))
+    query, params = incremental_query(source_type, table_name, state.columns, watermark_column, state.watermark)
+    batches = iter_pool_batches(pool, query, params)
+    try:
+        new_rows = merge_batches(state, batches)
+    finally:
+        batches.close()
+    state.save(state_path)
+    return state.profile(), state.rows, new_rows
+
+# File name for a table's artifacts
+def artifact_name(table_name: str) -> str:
+    return re.sub(r"[^\w.-]", "_", table_name)
+
+def _json_value(value):
+    if isinstance(value, (np.integer, np.floating)):
+        value = value.item()
+    return None if isinstance(value, float) and not np.isfinite(value) else value
+
+def write_table_artifact(output_dir: str, result: dict, profile: pd.DataFrame):
+    artifact = dict(result)
+    artifact["columns"] = {
+        col: {stat: _json_value(value) for stat, value in stats.items()}
+        for col, stats in profile.to_dict(orient="index").items()
+    }
+    with open(os.path.join(output_dir, f"{artifact_name(result['table'])}.json"), "w") as f:
+        json.dump(artifact, f, indent=2)
+
+# Profile tables (or every base table of a schema) concurrently, at most
+# `concurrency` queries at a time on this connection. A failing table is
+# recorded with its error and does not stop the run. Returns a per-table
+# summary and the combined profiles (one row per table and column); with
+# output_dir both are also written there, with a JSON file per table.
+def profile_tables(source_type: str, creds: dict, tables=None, schema=None, output_dir=None,
+                   concurrency=BATCH_CONCURRENCY, sample=None, conn_name="default", progress=print,
+                   watermark_column=None, state_dir=PROFILE_STATE_DIR):
+    pool = get_connection_pool(source_type, creds, max_size=concurrency)
+    try:
+        tables = list(tables or [])
+        if schema:
+            tables += list_schema_tables(pool, source_type, schema)
+        tables = list(dict.fromkeys(tables))
+        if output_dir:
+            os.makedirs(output_dir, exist_ok=True)
+
+        def run(table_name):
+            result = {"table": table_name, "source_type": source_type, "connection": conn_name,
+                      "profiled_at": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds")}
+            start = time.perf_counter()
+            try:
+                if watermark_column:
+                    state_path = profile_state_path(source_type, conn_name, table_name, state_dir)
+                    profile, row_count, new_rows = profile_table_incrementally(
+                        pool, source_type, table_name, watermark_column, state_path)
+                    result["new_rows"] = new_rows
+                else:
+                    profile, row_count = profile_table(pool, source_type, table_name, sample)
+                result.update(status="ok", rows=row_count, column_count=len(profile), error=None)
+            except Exception as e:
+                profile = None
+                result.update(status="failed", rows=None, column_count=None, error=str(e))
+            result["seconds"] = round(time.perf_counter() - start, 3)
+            if output_dir and profile is not None:
+                write_table_artifact(output_dir, result, profile)
+            return result, profile
+
+        results, profiles = [], []
+        with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="batch-profile") as executor:
+            futures = [executor.submit(run, table_name) for table_name in tables]
+            for done, future in enumerate(as_completed(futures), 1):
+                result, profile = future.result()
+                results.append(result)
+                if profile is not None:
+                    profiles.append(profile.rename_axis("column").reset_index().assign(table=result["table"]))
+                if progress is not None:
+                    progress(f"[{done}/{len(tables)}] {result['table']}: {result['status']} "
+                             f"({result['seconds']:.1f}s){' - ' + result['error'] if result['error'] else ''}")
+    finally:
+        close_connection_pool(source_type, creds)
+
+    results.sort(key=lambda result: tables.index(result["table"]))
+    summary = pd.DataFrame(results, columns=["table", "status", "rows", "column_count", "seconds", "error",
+                                             "source_type", "connection", "profiled_at"]
+                                            + (["new_rows"] if watermark_column else []))
+    combined = pd.concat(profiles, ignore_index=True) if profiles else pd.DataFrame(columns=["column", "table"])
+    combined = combined[["table", "column"] + [col for col in combined.columns if col not in ("table", "column")]]
+    if output_dir:
+        combined.to_parquet(os.path.join(output_dir, "profiles.parquet"), index=False)
+        with open(os.path.join(output_dir, "summary.json"), "w") as f:
+            json.dump(results, f, indent=2)
+    return summary, combined
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Profile many tables from one connection without the UI")
+    parser.add_argument("source_type", choices=sorted(CONNECTION_SPECS))
+    parser.add_argument("--connection", default="default", help="connection name in the credentials file or env vars")
+    parser.add_argument("--credentials", help="JSON credentials file (default: environment variables)")
+    parser.add_argument("--tables", nargs="*", default=[], help="tables as schema.table")
+    parser.add_argument("--tables-file", help="file with one table name per line")
+    parser.add_argument("--schema", help="profile every base table of this schema / database")
+    parser.add_argument("--output", required=True, help="directory for the profile artifacts")
+    parser.add_argument("--concurrency", type=int, default=BATCH_CONCURRENCY)
+    parser.add_argument("--watermark-column", help="profile incrementally, fetching only rows past this column's stored high-watermark")
+    parser.add_argument("--state-dir", default=PROFILE_STATE_DIR, help="directory for the incremental profile states")
+    args = parser.parse_args()
+    tables = list(args.tables)
+    if args.tables_file:
+        with open(args.tables_file) as f:
+            tables += [line.strip() for line in f if line.strip()]
+    if not tables and not args.schema:
+        parser.error("give --tables, --tables-file or --schema")
+    try:
+        creds = load_credentials(args.source_type, args.connection, args.credentials)
+    except (OSError, ValueError) as e:
+        parser.error(str(e))
+    summary, _ = profile_tables(args.source_type, creds, tables, args.schema, args.output,
+                                args.concurrency, conn_name=args.connection,
+                                watermark_column=args.watermark_column, state_dir=args.state_dir)
+    failed = (summary["status"] != "ok").sum()
+    print(f"Profiled {len(summary) - failed} of {len(summary)} tables; artifacts in {args.output}")
+    sys.exit(1 if failed else 0)
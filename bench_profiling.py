@@ -0,0 +1,143 @@
+import argparse
+import re
+import time
+import numpy as np
+import pandas as pd
+from type_detection import plan_conversions, apply_conversions
+from profile_stats import MomentAccumulator, zscore_outlier_counts
+from sketches import ColumnQuantileSketches
+from column_profiling import profile_numeric_columns, parallel_count_outliers, PROFILE_WORKERS
+from outliers import outlier_bounds
+
+# Synthetic profiling benchmarks. Run with:
+#   python bench_profiling.py --rows 10000000 --cols 100 > bench_output.txt
+
+# Mix of column kinds the profiling conversions care about
+def make_frame(rows: int, cols: int, seed=0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    pools = [
+        np.array(['yes', 'no', 'Yes', 'NO'], dtype=object),
+        np.array([f"cat_{i}" for i in range(12)], dtype=object),
+        np.array([f"${i:,}.00" for i in range(1000, 50000, 7)], dtype=object),
+        np.array([f"id_{i}" for i in range(200000)], dtype=object),
+    ]
+    data = {}
+    for i in range(cols):
+        kind = i % 5
+        if kind == 4:
+            data[f"num_{i}"] = rng.normal(size=rows)
+        else:
+            pool = pools[kind]
+            data[f"col_{i}"] = pd.Series(pool[rng.integers(0, len(pool), rows)], dtype=object)
+    return pd.DataFrame(data)
+
+# The conversion loops run_data_profiling_ui used before the planner
+def legacy_conversions(df: pd.DataFrame) -> dict:
+    conversion_summary = {}
+    for col in df.columns:
+        if "date" in col.lower():
+            df[col] = pd.to_datetime(df[col], errors='coerce')
+            conversion_summary[col] = "Converted to datetime"
+    for col in df.select_dtypes(include='object').columns:
+        unique_vals = df[col].dropna().unique()
+        if set(map(str.lower, map(str, unique_vals))).issubset({'yes', 'no', 'true', 'false', '0', '1'}):
+            df[col] = df[col].map(lambda x: str(x).strip().lower() in ['yes', 'true', '1'])
+            conversion_summary[col] = "Converted to boolean"
+    for col in df.select_dtypes(include='object').columns:
+        if df[col].nunique() <= 20 and col not in conversion_summary:
+            df[col] = df[col].astype('category')
+            conversion_summary[col] = "Converted to category"
+    for col in df.columns:
+        if df[col].dtype == 'object':
+            sample_vals = df[col].dropna().astype(str).head(10)
+            if sample_vals.apply(lambda x: bool(re.search(r'[$%,]', x))).any():
+                df[col] = df[col].replace('[$%,]', '', regex=True)
+                df[col] = pd.to_numeric(df[col], errors='coerce')
+                conversion_summary[col] = "Parsed numeric values with symbols"
+    return conversion_summary
+
+# The statistics loops run_data_profiling_ui used before the accumulators:
+# describe(), per-column skewness/kurtosis, a z-score frame and per-column IQR
+# scans. scipy's skew/kurtosis/zscore are replaced by the pandas equivalents
+# (same passes over the data), since scipy is no longer a dependency.
+def legacy_column_profiling(df: pd.DataFrame) -> pd.DataFrame:
+    numerical_cols = df.select_dtypes(include='number').columns
+    summary = df.describe()
+    for col in numerical_cols:
+        df[col].skew()
+        df[col].kurt()
+    z_scores = df[numerical_cols].apply(lambda s: (s - s.mean()) / s.std(ddof=0))
+    for col in numerical_cols:
+        (z_scores[col].abs() > 3).sum()
+    for col in numerical_cols:
+        q1 = df[col].quantile(0.25)
+        q3 = df[col].quantile(0.75)
+        iqr = q3 - q1
+        len(df[(df[col] < q1 - 1.5 * iqr) | (df[col] > q3 + 1.5 * iqr)])
+    return summary
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return time.perf_counter() - start, result
+
+def bench_type_detection(rows: int, cols: int):
+    base = make_frame(rows, cols)
+    legacy_time, legacy_summary = timed(legacy_conversions, base.copy())
+    planned_time, planned_summary = timed(lambda df: apply_conversions(df, plan_conversions(df)), base.copy())
+    assert legacy_summary == planned_summary, "planner and legacy loops disagree"
+    print(f"type detection  rows={rows:,} cols={cols}: legacy {legacy_time:.2f}s, "
+          f"planned {planned_time:.2f}s, speed-up {legacy_time / planned_time:.1f}x")
+
+# String timestamps parsed the legacy way (no format) versus with an inferred format
+def bench_datetime_parsing(rows: int, cols: int):
+    rng = np.random.default_rng(0)
+    stamps = pd.Timestamp("2020-01-01") + pd.to_timedelta(rng.integers(0, 10 ** 8, rows), unit="s")
+    values = pd.Series(stamps.strftime("%d/%m/%Y %H:%M:%S"), dtype=object)
+    legacy_time, legacy = timed(lambda s: pd.to_datetime(s, errors='coerce', dayfirst=True), values)
+    planned_time, planned = timed(lambda s: apply_conversions(s.to_frame("event_date"), plan_conversions(s.to_frame("event_date"))), values)
+    print(f"datetime parsing rows={rows:,}: legacy {legacy_time:.2f}s, "
+          f"planned {planned_time:.2f}s, speed-up {legacy_time / planned_time:.1f}x")
+
+# The legacy per-column loops versus the serial accumulator scans and the
+# column-parallel executor (which also counts MAD outliers in its single
+# comparison pass). Speed-ups are relative to the legacy loops.
+def bench_column_profiling(rows: int, cols: int):
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame(rng.normal(size=(rows, cols)), columns=[f"num_{i}" for i in range(cols)])
+    columns = list(df.columns)
+
+    def serial():
+        moments = MomentAccumulator(columns).update(df)
+        ColumnQuantileSketches(columns).update(df)
+        zscore_outlier_counts(df, moments)
+        return moments
+
+    def parallel():
+        moments, sketches = profile_numeric_columns(df, columns)
+        parallel_count_outliers(df, outlier_bounds(moments, sketches))
+        return moments
+
+    legacy_time, legacy_summary = timed(legacy_column_profiling, df)
+    serial_time, serial_moments = timed(serial)
+    parallel_time, parallel_moments = timed(parallel)
+    assert np.allclose(legacy_summary.loc["mean", columns], parallel_moments.mean), "legacy and parallel profiles disagree"
+    assert np.allclose(serial_moments.mean, parallel_moments.mean), "parallel and serial profiles disagree"
+    print(f"column profiling rows={rows:,} cols={cols} workers={PROFILE_WORKERS}: legacy {legacy_time:.2f}s, "
+          f"serial {serial_time:.2f}s ({legacy_time / serial_time:.1f}x), "
+          f"parallel {parallel_time:.2f}s ({legacy_time / parallel_time:.1f}x)")
+
+BENCHMARKS = {
+    "type_detection": bench_type_detection,
+    "datetime_parsing": bench_datetime_parsing,
+    "column_profiling": bench_column_profiling,
+}
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Profiling pipeline benchmarks")
+    parser.add_argument("--rows", type=int, default=10_000_000)
+    parser.add_argument("--cols", type=int, default=100)
+    parser.add_argument("benchmarks", nargs="*", default=list(BENCHMARKS))
+    args = parser.parse_args()
+    for name in args.benchmarks:
+        BENCHMARKS[name](args.rows, args.cols)
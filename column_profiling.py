@@ -0,0 +1,76 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import pandas as pd
+from profile_stats import MomentAccumulator, iter_value_blocks, BLOCK_ROWS
+from sketches import ColumnQuantileSketches, DistinctCounter
+from outliers import OutlierCounter, count_outliers
+
+PROFILE_WORKERS = min(8, os.cpu_count() or 1)
+
+# Workers share the frame's column buffers, so no frame is pickled per task.
+# Each task copies only its own columns into float64 blocks, and the NumPy
+# kernels that dominate a block release the GIL.
+_profile_pool = ThreadPoolExecutor(max_workers=PROFILE_WORKERS, thread_name_prefix="column-profile")
+
+# Split columns into at most `workers` contiguous chunks of similar width
+def column_chunks(columns, workers=PROFILE_WORKERS) -> list:
+    columns = list(columns)
+    if not columns:
+        return []
+    return [chunk.tolist() for chunk in np.array_split(np.array(columns, dtype=object), min(workers, len(columns)))]
+
+# func(df, chunk) for every column chunk, on the pool when there is more than one
+def map_column_chunks(func, df: pd.DataFrame, columns, workers=PROFILE_WORKERS) -> list:
+    chunks = column_chunks(columns, workers)
+    if len(chunks) <= 1:
+        return [func(df, chunk) for chunk in chunks]
+    return list(_profile_pool.map(lambda chunk: func(df, chunk), chunks))
+
+# Moments and quantile sketches of one column chunk from a single block scan
+def _profile_chunk(df: pd.DataFrame, columns, exact=False):
+    moments = MomentAccumulator(columns)
+    sketches = ColumnQuantileSketches(columns, exact=exact)
+    for values in iter_value_blocks(df, columns):
+        moments.update_values(values)
+        sketches.update_values(values)
+    return moments, sketches
+
+# Column-parallel equivalent of MomentAccumulator(columns).update(df) and
+# ColumnQuantileSketches(columns, exact=exact).update(df)
+def profile_numeric_columns(df: pd.DataFrame, columns, exact=False, workers=PROFILE_WORKERS):
+    columns = list(columns)
+    parts = map_column_chunks(lambda frame, chunk: _profile_chunk(frame, chunk, exact), df, columns, workers)
+    if not parts:
+        return MomentAccumulator(columns), ColumnQuantileSketches(columns, exact=exact)
+    return (MomentAccumulator.concat([moments for moments, _ in parts]),
+            ColumnQuantileSketches.concat([sketches for _, sketches in parts]))
+
+# Distinct values of one column chunk: exact up to `limit`, with a HyperLogLog
+# estimate of every column built in the same scan
+def _distinct_chunk(df: pd.DataFrame, columns, limit=None):
+    counters = {}
+    for col in columns:
+        series = df[col]
+        counter = counters[col] = DistinctCounter(limit, approximate=True)
+        for start in range(0, len(series), BLOCK_ROWS):
+            counter.update(series.iloc[start:start + BLOCK_ROWS])
+    return counters
+
+# {column: DistinctCounter} from one column-parallel scan; count() is exact
+# while a column has at most `limit` distinct values, estimated beyond that
+def profile_distinct_columns(df: pd.DataFrame, columns, limit=None, workers=PROFILE_WORKERS) -> dict:
+    counters = {}
+    for part in map_column_chunks(lambda frame, chunk: _distinct_chunk(frame, chunk, limit), df, columns, workers):
+        counters.update(part)
+    return counters
+
+# Column-parallel count_outliers; bounds as returned by outliers.outlier_bounds
+def parallel_count_outliers(df: pd.DataFrame, bounds: dict, sample_limit=0, workers=PROFILE_WORKERS) -> OutlierCounter:
+    columns = list(next(iter(bounds.values())).index)
+    parts = map_column_chunks(
+        lambda frame, chunk: count_outliers(frame, {method: b.loc[chunk] for method, b in bounds.items()}, sample_limit),
+        df, columns, workers)
+    if not parts:
+        return OutlierCounter(bounds, sample_limit)
+    return OutlierCounter.concat(parts)
@@ -1,155 +1,337 @@
-import streamlit as st
-from cryptography.fernet import Fernet
-import teradatasql
-import pyodbc
-import requests
-import os
-
-# Persistent encryption key setup
-KEY_FILE = "fernet.key"
-
-def load_or_generate_key():
-    if os.path.exists(KEY_FILE):
-        with open(KEY_FILE, "rb") as f:
-            return f.read()
-    else:
-        key = Fernet.generate_key()
-        with open(KEY_FILE, "wb") as f:
-            f.write(key)
-        return key
-
-if "encryption_key" not in st.session_state:
-    st.session_state["encryption_key"] = load_or_generate_key()
-
-fernet = Fernet(st.session_state["encryption_key"])
-
-# Encryption helpers
-def encrypt_credential(credential: str) -> str:
-    return fernet.encrypt(credential.encode()).decode()
-
-def decrypt_credential(encrypted_credential: str) -> str:
-    try:
-        return fernet.decrypt(encrypted_credential.encode()).decode()
-    except Exception:
-        return ""
-
-# Store credentials and track connection names
-def store_credentials(source_type: str, conn_name: str, **kwargs):
-    for key, value in kwargs.items():
-        st.session_state[f"{source_type}_{conn_name}_{key}"] = encrypt_credential(value)
-    conn_list_key = f"{source_type}_connections"
-    if conn_list_key not in st.session_state:
-        st.session_state[conn_list_key] = []
-    if conn_name not in st.session_state[conn_list_key]:
-        st.session_state[conn_list_key].append(conn_name)
-
-# Retrieve credentials
-def get_credentials(source_type: str, conn_name: str, keys: list) -> dict:
-    return {
-        key: decrypt_credential(st.session_state.get(f"{source_type}_{conn_name}_{key}", ""))
-        for key in keys
-    }
-
-# List saved connections
-def get_saved_connections(source_type: str) -> list:
-    return st.session_state.get(f"{source_type}_connections", [])
-
-# Teradata connection
-def get_teradata_connection(conn_name="default"):
-    try:
-        creds = get_credentials("teradata", conn_name, ["host", "user", "password"])
-        return teradatasql.connect(
-            host=creds["host"],
-            user=creds["user"],
-            password=creds["password"]
-        )
-    except Exception as e:
-        st.error(f"Failed to connect to Teradata: {e}")
-        return None
-
-# Azure SQL DB connection
-def get_azure_sql_connection(conn_name="default"):
-    try:
-        creds = get_credentials("azuresql", conn_name, ["server", "database", "user", "password"])
-        conn_str = (
-            f"DRIVER={{ODBC Driver 17 for SQL Server}};"
-            f"SERVER={creds['server']};DATABASE={creds['database']};"
-            f"UID={creds['user']};PWD={creds['password']}"
-        )
-        return pyodbc.connect(conn_str)
-    except Exception as e:
-        st.error(f"Failed to connect to Azure SQL DB: {e}")
-        return None
-
-# Databricks catalog access
-def get_databricks_catalog(conn_name="default"):
-    try:
-        creds = get_credentials("databricks", conn_name, ["workspace_url", "access_token"])
-        headers = {"Authorization": f"Bearer {creds['access_token']}"}
-        response = requests.get(f"{creds['workspace_url']}/api/2.0/unity-catalog/catalogs", headers=headers)
-        if response.status_code == 200:
-            return response.json()
-        else:
-            st.error(f"Databricks API error: {response.status_code} - {response.text}")
-            return None
-    except Exception as e:
-        st.error(f"Failed to access Databricks catalog: {e}")
-        return None
-
-# UI for storing credentials
-def run_connector_ui():
-    st.title("Setup Connector")
-    source = st.selectbox("Select Connection type", ["Teradata", "Azure SQL DB", "Databricks"])
-    source_key_map = {
-        "Teradata": "teradata",
-        "Azure SQL DB": "azuresql",
-        "Databricks": "databricks"
-    }
-    source_key = source_key_map[source]
-    saved_conns = get_saved_connections(source_key)
-    mode = st.radio("Choose Mode", ["Create New Connection", "Edit Existing Connection"])
-
-    if mode == "Edit Existing Connection" and saved_conns:
-        conn_name = st.selectbox("Select Connection to Edit", saved_conns)
-    else:
-        conn_name = st.text_input("Enter New Connection Name", value="")
-
-    existing_creds = {}
-    if mode == "Edit Existing Connection" and conn_name in saved_conns:
-        if source_key == "teradata":
-            existing_creds = get_credentials(source_key, conn_name, ["host", "user", "password"])
-        elif source_key == "azuresql":
-            existing_creds = get_credentials(source_key, conn_name, ["server", "database", "user", "password"])
-        elif source_key == "databricks":
-            existing_creds = get_credentials(source_key, conn_name, ["workspace_url", "access_token"])
-
-    if source == "Teradata":
-        host = st.text_input("Teradata Host", value=existing_creds.get("host", ""))
-        user = st.text_input("Teradata Username", value=existing_creds.get("user", ""))
-        password = st.text_input("Teradata Password", type="password", value=existing_creds.get("password", ""))
-        if st.button("Save Teradata Credentials"):
-            if host and user and password and conn_name:
-                store_credentials("teradata", conn_name, host=host, user=user, password=password)
-                st.success(f"Teradata credentials saved/updated as '{conn_name}'.")
-            else:
-                st.error("Please fill in all fields.")
-    elif source == "Azure SQL DB":
-        server = st.text_input("Azure SQL Server", value=existing_creds.get("server", ""))
-        database = st.text_input("Database Name", value=existing_creds.get("database", ""))
-        user = st.text_input("Username", value=existing_creds.get("user", ""))
-        password = st.text_input("Password", type="password", value=existing_creds.get("password", ""))
-        if st.button("Save Azure SQL Credentials"):
-            if server and database and user and password and conn_name:
-                store_credentials("azuresql", conn_name, server=server, database=database, user=user, password=password)
-                st.success(f"Azure SQL credentials saved/updated as '{conn_name}'.")
-            else:
-                st.error("Please fill in all fields.")
-    elif source == "Databricks":
-        workspace_url = st.text_input("Databricks Workspace URL", value=existing_creds.get("workspace_url", ""))
-        access_token = st.text_input("Access Token", type="password", value=existing_creds.get("access_token", ""))
-        if st.button("Save Databricks Credentials"):
-            if workspace_url and access_token and conn_name:
-                store_credentials("databricks", conn_name, workspace_url=workspace_url, access_token=access_token)
-                st.success(f"Databricks credentials saved/updated as '{conn_name}'.")
-            else:
-                st.error("Please fill in all fields.")
+import streamlit as st
+from cryptography.fernet import Fernet
+import teradatasql
+import pyodbc
+import requests
+import os
+import hashlib
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+# Persistent encryption key setup
+KEY_FILE = "fernet.key"
+
+def load_or_generate_key():
+    if os.path.exists(KEY_FILE):
+        with open(KEY_FILE, "rb") as f:
+            return f.read()
+    else:
+        key = Fernet.generate_key()
+        with open(KEY_FILE, "wb") as f:
+            f.write(key)
+        return key
+
+if "encryption_key" not in st.session_state:
+    st.session_state["encryption_key"] = load_or_generate_key()
+
+fernet = Fernet(st.session_state["encryption_key"])
+
+# Encryption helpers
+def encrypt_credential(credential: str) -> str:
+    return fernet.encrypt(credential.encode()).decode()
+
+def decrypt_credential(encrypted_credential: str) -> str:
+    try:
+        return fernet.decrypt(encrypted_credential.encode()).decode()
+    except Exception:
+        return ""
+
+# Store credentials and track connection names
+def store_credentials(source_type: str, conn_name: str, **kwargs):
+    if source_type in CONNECTION_SPECS and conn_name in get_saved_connections(source_type):
+        _, keys, _ = CONNECTION_SPECS[source_type]
+        previous = get_credentials(source_type, conn_name, keys)
+        if previous != {key: kwargs.get(key, "") for key in keys}:
+            close_connection_pool(source_type, previous)
+    for key, value in kwargs.items():
+        st.session_state[f"{source_type}_{conn_name}_{key}"] = encrypt_credential(value)
+    conn_list_key = f"{source_type}_connections"
+    if conn_list_key not in st.session_state:
+        st.session_state[conn_list_key] = []
+    if conn_name not in st.session_state[conn_list_key]:
+        st.session_state[conn_list_key].append(conn_name)
+
+# Retrieve credentials
+def get_credentials(source_type: str, conn_name: str, keys: list) -> dict:
+    return {
+        key: decrypt_credential(st.session_state.get(f"{source_type}_{conn_name}_{key}", ""))
+        for key in keys
+    }
+
+# List saved connections
+def get_saved_connections(source_type: str) -> list:
+    return st.session_state.get(f"{source_type}_connections", [])
+
+# Raw (unpooled) connection factories
+def open_teradata_connection(creds: dict):
+    return teradatasql.connect(
+        host=creds["host"],
+        user=creds["user"],
+        password=creds["password"]
+    )
+
+def open_azure_sql_connection(creds: dict):
+    conn_str = (
+        f"DRIVER={{ODBC Driver 17 for SQL Server}};"
+        f"SERVER={creds['server']};DATABASE={creds['database']};"
+        f"UID={creds['user']};PWD={creds['password']}"
+    )
+    return pyodbc.connect(conn_str)
+
+CONNECTION_SPECS = {
+    "teradata": ("Teradata", ["host", "user", "password"], open_teradata_connection),
+    "azuresql": ("Azure SQL DB", ["server", "database", "user", "password"], open_azure_sql_connection),
+}
+
+# Connection pooling
+# Idle connections kept open past the idle timeout; connections are opened on
+# demand only, the pool does not pre-open these
+POOL_MIN_IDLE = 1
+POOL_MAX_SIZE = 4
+POOL_IDLE_TIMEOUT = 300  # seconds an idle connection is kept above POOL_MIN_IDLE
+POOL_CHECKOUT_TIMEOUT = 60  # seconds to wait for a free connection when the pool is full
+
+def _close_quietly(conn):
+    try:
+        conn.close()
+    except Exception:
+        pass
+
+def _is_alive(conn) -> bool:
+    try:
+        cursor = conn.cursor()
+        cursor.execute("SELECT 1")
+        cursor.fetchall()
+        cursor.close()
+        return True
+    except Exception:
+        return False
+
+class ConnectionPool:
+    # Thread-safe pool: LIFO reuse of idle connections, a liveness probe on
+    # checkout and eviction of connections idle for longer than idle_timeout,
+    # down to min_idle of them.
+    def __init__(self, factory, min_idle=POOL_MIN_IDLE, max_size=POOL_MAX_SIZE,
+                 idle_timeout=POOL_IDLE_TIMEOUT, checkout_timeout=POOL_CHECKOUT_TIMEOUT):
+        self._factory = factory
+        self.min_idle = min_idle
+        self.max_size = max(max_size, 1)
+        self.idle_timeout = idle_timeout
+        self.checkout_timeout = checkout_timeout
+        self._idle = deque()  # (connection, last_returned), oldest on the left
+        self._size = 0
+        self._closed = False
+        self._cond = threading.Condition()
+
+    def _evict_idle_locked(self) -> list:
+        expired = []
+        now = time.monotonic()
+        while len(self._idle) > self.min_idle and now - self._idle[0][1] > self.idle_timeout:
+            conn, _ = self._idle.popleft()
+            self._size -= 1
+            expired.append(conn)
+        return expired
+
+    def acquire(self):
+        deadline = time.monotonic() + self.checkout_timeout
+        while True:
+            conn = None
+            create = False
+            with self._cond:
+                if self._closed:
+                    raise RuntimeError("Connection pool is closed")
+                expired = self._evict_idle_locked()
+                while not self._idle and self._size >= self.max_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise TimeoutError(f"No pooled connection available after {self.checkout_timeout}s")
+                    self._cond.wait(remaining)
+                if self._idle:
+                    conn, _ = self._idle.pop()
+                else:
+                    self._size += 1
+                    create = True
+            for stale in expired:
+                _close_quietly(stale)
+
+            if create:
+                try:
+                    return self._factory()
+                except Exception:
+                    with self._cond:
+                        self._size -= 1
+                        self._cond.notify()
+                    raise
+            if _is_alive(conn):
+                return conn
+            self._discard(conn)
+
+    def release(self, conn):
+        # End any open transaction so the next borrower starts from a clean state.
+        if not getattr(conn, "autocommit", True):
+            try:
+                conn.rollback()
+            except Exception:
+                self._discard(conn)
+                return
+        with self._cond:
+            if self._closed:
+                self._size -= 1
+                _close_quietly(conn)
+            else:
+                self._idle.append((conn, time.monotonic()))
+            self._cond.notify()
+
+    def _discard(self, conn):
+        _close_quietly(conn)
+        with self._cond:
+            self._size -= 1
+            self._cond.notify()
+
+    @contextmanager
+    def connection(self):
+        conn = self.acquire()
+        try:
+            yield conn
+        finally:
+            self.release(conn)
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            idle = [conn for conn, _ in self._idle]
+            self._size -= len(idle)
+            self._idle.clear()
+            self._cond.notify_all()
+        for conn in idle:
+            _close_quietly(conn)
+
+# Pools are process-wide so they survive Streamlit reruns and are shared by
+# sessions using the same credentials.
+@st.cache_resource
+def _pool_registry():
+    return {"lock": threading.Lock(), "pools": {}}
+
+def connection_key(source_type: str, creds: dict) -> str:
+    digest = hashlib.sha256(repr(sorted(creds.items())).encode()).hexdigest()[:16]
+    return f"{source_type}:{digest}"
+
+def get_connection_pool(source_type: str, creds: dict, **pool_options) -> ConnectionPool:
+    _, _, factory = CONNECTION_SPECS[source_type]
+    key = connection_key(source_type, creds)
+    registry = _pool_registry()
+    with registry["lock"]:
+        pool = registry["pools"].get(key)
+        if pool is None:
+            pool = ConnectionPool(lambda: factory(creds), **pool_options)
+            registry["pools"][key] = pool
+    return pool
+
+def close_connection_pool(source_type: str, creds: dict):
+    registry = _pool_registry()
+    with registry["lock"]:
+        pool = registry["pools"].pop(connection_key(source_type, creds), None)
+    if pool is not None:
+        pool.close()
+
+def get_saved_connection_key(source_type: str, conn_name: str) -> str:
+    _, keys, _ = CONNECTION_SPECS[source_type]
+    return connection_key(source_type, get_credentials(source_type, conn_name, keys))
+
+# Pooled connection for a saved connector; yields None (after reporting the
+# error) when no connection can be opened.
+@contextmanager
+def pooled_connection(source_type: str, conn_name="default"):
+    label, keys, _ = CONNECTION_SPECS[source_type]
+    try:
+        pool = get_connection_pool(source_type, get_credentials(source_type, conn_name, keys))
+        conn = pool.acquire()
+    except Exception as e:
+        st.error(f"Failed to connect to {label}: {e}")
+        yield None
+        return
+    try:
+        yield conn
+    finally:
+        pool.release(conn)
+
+def teradata_connection(conn_name="default"):
+    return pooled_connection("teradata", conn_name)
+
+def azure_sql_connection(conn_name="default"):
+    return pooled_connection("azuresql", conn_name)
+
+# Databricks catalog access
+def get_databricks_catalog(conn_name="default"):
+    try:
+        creds = get_credentials("databricks", conn_name, ["workspace_url", "access_token"])
+        headers = {"Authorization": f"Bearer {creds['access_token']}"}
+        response = requests.get(f"{creds['workspace_url']}/api/2.0/unity-catalog/catalogs", headers=headers)
+        if response.status_code == 200:
+            return response.json()
+        else:
+            st.error(f"Databricks API error: {response.status_code} - {response.text}")
+            return None
+    except Exception as e:
+        st.error(f"Failed to access Databricks catalog: {e}")
+        return None
+
+# UI for storing credentials
+def run_connector_ui():
+    st.title("Setup Connector")
+    source = st.selectbox("Select Connection type", ["Teradata", "Azure SQL DB", "Databricks"])
+    source_key_map = {
+        "Teradata": "teradata",
+        "Azure SQL DB": "azuresql",
+        "Databricks": "databricks"
+    }
+    source_key = source_key_map[source]
+    saved_conns = get_saved_connections(source_key)
+    mode = st.radio("Choose Mode", ["Create New Connection", "Edit Existing Connection"])
+
+    if mode == "Edit Existing Connection" and saved_conns:
+        conn_name = st.selectbox("Select Connection to Edit", saved_conns)
+    else:
+        conn_name = st.text_input("Enter New Connection Name", value="")
+
+    existing_creds = {}
+    if mode == "Edit Existing Connection" and conn_name in saved_conns:
+        if source_key == "teradata":
+            existing_creds = get_credentials(source_key, conn_name, ["host", "user", "password"])
+        elif source_key == "azuresql":
+            existing_creds = get_credentials(source_key, conn_name, ["server", "database", "user", "password"])
+        elif source_key == "databricks":
+            existing_creds = get_credentials(source_key, conn_name, ["workspace_url", "access_token"])
+
+    if source == "Teradata":
+        host = st.text_input("Teradata Host", value=existing_creds.get("host", ""))
+        user = st.text_input("Teradata Username", value=existing_creds.get("user", ""))
+        password = st.text_input("Teradata Password", type="password", value=existing_creds.get("password", ""))
+        if st.button("Save Teradata Credentials"):
+            if host and user and password and conn_name:
+                store_credentials("teradata", conn_name, host=host, user=user, password=password)
+                st.success(f"Teradata credentials saved/updated as '{conn_name}'.")
+            else:
+                st.error("Please fill in all fields.")
+    elif source == "Azure SQL DB":
+        server = st.text_input("Azure SQL Server", value=existing_creds.get("server", ""))
+        database = st.text_input("Database Name", value=existing_creds.get("database", ""))
+        user = st.text_input("Username", value=existing_creds.get("user", ""))
+        password = st.text_input("Password", type="password", value=existing_creds.get("password", ""))
+        if st.button("Save Azure SQL Credentials"):
+            if server and database and user and password and conn_name:
+                store_credentials("azuresql", conn_name, server=server, database=database, user=user, password=password)
+                st.success(f"Azure SQL credentials saved/updated as '{conn_name}'.")
+            else:
+                st.error("Please fill in all fields.")
+    elif source == "Databricks":
+        workspace_url = st.text_input("Databricks Workspace URL", value=existing_creds.get("workspace_url", ""))
+        access_token = st.text_input("Access Token", type="password", value=existing_creds.get("access_token", ""))
+        if st.button("Save Databricks Credentials"):
+            if workspace_url and access_token and conn_name:
+                store_credentials("databricks", conn_name, workspace_url=workspace_url, access_token=access_token)
+                st.success(f"Databricks credentials saved/updated as '{conn_name}'.")
+            else:
+                st.error("Please fill in all fields.")
@@ -0,0 +1,296 @@
+import datetime
+import decimal
+import hashlib
+import uuid
+from functools import partial
+import streamlit as st
+import pandas as pd
+import pyarrow as pa
+from connector import pooled_connection, get_saved_connection_key
+from result_cache import LRUCache
+from fingerprint import table_fingerprint
+from sql_builder import build_select, build_columns_query
+from dtype_optimizer import optimize_dtypes
+
+# Rows pulled per cursor.fetchmany call; bounds the memory held per batch
+DEFAULT_BATCH_SIZE = 50_000
+
+# Fetched frames are shared across reruns, pages and sessions
+RESULT_CACHE_TTL = 15 * 60  # seconds
+RESULT_CACHE_MAX_BYTES = 2 * 1024 ** 3
+
+# Arrow types for the Python type codes that teradatasql and pyodbc report in
+# cursor.description. Decimals are read as float64, as coerce_float did.
+ARROW_TYPE_CODES = {
+    bool: pa.bool_(),
+    int: pa.int64(),
+    float: pa.float64(),
+    decimal.Decimal: pa.float64(),
+    str: pa.string(),
+    bytes: pa.binary(),
+    bytearray: pa.binary(),
+    datetime.datetime: pa.timestamp("us"),
+    datetime.date: pa.date32(),
+    datetime.time: pa.time64("us"),
+}
+
+# One Arrow type per result column; None where the driver type is not known
+# and the type is inferred from the values instead
+def arrow_types(description) -> list:
+    return [ARROW_TYPE_CODES.get(desc[1]) for desc in description]
+
+# Build one typed column buffer from a column of driver values
+def column_to_arrow(values, arrow_type=None) -> pa.Array:
+    if arrow_type is None:
+        return pa.array(values)
+    try:
+        return pa.array(values, type=arrow_type)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        if pa.types.is_floating(arrow_type):
+            # Decimal values; float() per value is far cheaper than inferring a decimal type
+            return pa.array([None if v is None else float(v) for v in values], type=arrow_type)
+        # A driver reporting a looser type code: infer, then cast
+        inferred = pa.array(values)
+        try:
+            return inferred.cast(arrow_type)
+        except (pa.ArrowInvalid, pa.ArrowNotImplementedError):
+            return inferred
+
+# Convert one fetchmany result into a DataFrame or an Arrow RecordBatch
+def rows_to_frame(rows, columns):
+    return pd.DataFrame.from_records([tuple(row) for row in rows], columns=columns, coerce_float=True)
+
+def rows_to_record_batch(rows, columns, types=None):
+    types = types or [None] * len(columns)
+    if not rows:
+        return pa.RecordBatch.from_arrays([pa.array([], type=t or pa.null()) for t in types], names=columns)
+    arrays = [column_to_arrow(list(values), t) for values, t in zip(zip(*rows), types)]
+    return pa.RecordBatch.from_arrays(arrays, names=columns)
+
+# Arrow-backed pandas: strings stay in their Arrow buffers instead of becoming
+# Python objects, and each numeric column converts into its own block.
+# The table is released while converting, so peak memory stays near one copy.
+def arrow_to_frame(table: pa.Table, date_as_object=True) -> pd.DataFrame:
+    return table.to_pandas(
+        types_mapper=lambda t: pd.StringDtype("pyarrow") if pa.types.is_string(t) or pa.types.is_large_string(t) else None,
+        split_blocks=True,
+        self_destruct=True,
+        date_as_object=date_as_object,
+    )
+
+# Yield fixed-size batches from an executed cursor
+def iter_cursor_batches(cursor, batch_size=DEFAULT_BATCH_SIZE, as_arrow=False):
+    columns = [desc[0] for desc in cursor.description]
+    if as_arrow:
+        convert = partial(rows_to_record_batch, types=arrow_types(cursor.description))
+    else:
+        convert = rows_to_frame
+    first = True
+    while True:
+        rows = cursor.fetchmany(batch_size)
+        if not rows:
+            if first:
+                # Keep the column names of an empty result
+                yield convert([], columns)
+            break
+        first = False
+        yield convert(rows, columns)
+
+# Stream a query from a saved connection; the pooled connection is held only
+# while the generator is being consumed.
+def iter_query_batches(source_type: str, conn_name: str, query: str,
+                       batch_size=DEFAULT_BATCH_SIZE, as_arrow=False, params=None):
+    with pooled_connection(source_type, conn_name) as con:
+        if con is None:
+            st.stop()
+        cursor = con.cursor()
+        try:
+            if params:
+                cursor.execute(query, params)
+            else:
+                cursor.execute(query)
+            yield from iter_cursor_batches(cursor, batch_size, as_arrow)
+        finally:
+            cursor.close()
+
+def iter_table_batches(source_type: str, conn_name: str, table_name: str, columns=None, sample=None,
+                       batch_size=DEFAULT_BATCH_SIZE, as_arrow=False):
+    query = build_select(table_name, source_type, columns=columns, sample=sample)
+    return iter_query_batches(source_type, conn_name, query, batch_size, as_arrow)
+
+# Materialize a streamed query, stopping after max_rows (None or 0 = no limit)
+# Batches are built as typed Arrow columns straight from the cursor rows, so no
+# intermediate row-wise DataFrame is created
+def fetch_query_arrow(source_type: str, conn_name: str, query: str, max_rows=None,
+                      batch_size=DEFAULT_BATCH_SIZE, progress=None, params=None) -> pa.Table:
+    tables = []
+    loaded = 0
+    batches = iter_query_batches(source_type, conn_name, query, batch_size, as_arrow=True, params=params)
+    try:
+        for batch in batches:
+            if max_rows and loaded + batch.num_rows > max_rows:
+                batch = batch.slice(0, max_rows - loaded)
+            tables.append(pa.Table.from_batches([batch]))
+            loaded += batch.num_rows
+            if progress is not None:
+                progress.text(f"Loaded {loaded:,} rows...")
+            if max_rows and loaded >= max_rows:
+                break
+    finally:
+        batches.close()
+    # Columns whose type was inferred may differ between batches (all-null batches)
+    return pa.concat_tables(tables, promote_options="permissive")
+
+def fetch_query(source_type: str, conn_name: str, query: str, max_rows=None,
+                batch_size=DEFAULT_BATCH_SIZE, progress=None, params=None) -> pd.DataFrame:
+    return arrow_to_frame(fetch_query_arrow(source_type, conn_name, query, max_rows, batch_size, progress, params))
+
+def fetch_table(source_type: str, conn_name: str, table_name: str, max_rows=None, columns=None,
+                sample=None, batch_size=DEFAULT_BATCH_SIZE, progress=None) -> pd.DataFrame:
+    query = build_select(table_name, source_type, columns=columns, limit=max_rows, sample=sample)
+    return fetch_query(source_type, conn_name, query, max_rows, batch_size, progress)
+
+# With copy-on-write (always on from pandas 3) a shallow copy is enough: the UIs
+# replace columns, and a replaced column never writes into the cached buffers
+def private_copy(df: pd.DataFrame) -> pd.DataFrame:
+    if int(pd.__version__.split(".")[0]) >= 3 or pd.get_option("mode.copy_on_write") is True:
+        return df.copy(deep=False)
+    return df.copy()
+
+def frame_nbytes(df: pd.DataFrame) -> int:
+    return int(df.memory_usage(index=True, deep=True).sum())
+
+@st.cache_resource
+def _result_cache() -> LRUCache:
+    return LRUCache(max_bytes=RESULT_CACHE_MAX_BYTES, ttl=RESULT_CACHE_TTL, sizeof=frame_nbytes)
+
+# Staged results (staging.StagedTable) are cached apart from the frames, within
+# a disk budget; an evicted table deletes its file once no session holds it.
+# Created once per process, which is when files of earlier runs are swept.
+@st.cache_resource
+def _staged_cache() -> LRUCache:
+    # Imported here: staging imports this module
+    from staging import STAGING_DISK_BUDGET, sweep_stale_stages
+    sweep_stale_stages()
+    return LRUCache(max_bytes=STAGING_DISK_BUDGET, ttl=RESULT_CACHE_TTL, sizeof=lambda staged: staged.nbytes)
+
+# version is a table fingerprint, so a reload or DDL change misses the cache.
+# max_rows is part of the key because the limit is not always in the SQL text
+# (Teradata applies it while streaming when the query has a SAMPLE).
+def result_cache_key(source_type: str, conn_name: str, query: str, columns=None, sample=None, params=None,
+                     version=None, optimize=False, max_rows=None):
+    return (
+        get_saved_connection_key(source_type, conn_name),
+        query,
+        int(max_rows) if max_rows else None,
+        tuple(columns) if columns else None,
+        sample,
+        tuple(params) if params else None,
+        version,
+        optimize,
+    )
+
+# Identity of one fetched result for downstream caches (pipeline stages): the
+# result cache key, which carries the table fingerprint, plus a token of the
+# fetch, so a refetch (Refresh, expiry) never matches outputs of an older one
+# even when the catalog fingerprint did not move (Teradata in-place UPDATEs).
+def result_id(key) -> str:
+    digest = hashlib.blake2b(repr(key).encode(), digest_size=16).hexdigest()
+    return f"{digest}:{uuid.uuid4().hex}"
+
+# Cached fetch keyed by connection, SQL text, projection and sample spec.
+# Callers get a private copy because the UIs convert columns in place.
+# With optimize=True the frame is downcast before it is cached, and the
+# per-column memory report is attached to df.attrs (see memory_report_ui).
+# df.attrs["result_id"] identifies the fetched result (see result_id).
+# With stage_above (bytes) a result that outgrows it is staged on local disk
+# and returned as a staging.StagedTable instead of a DataFrame.
+def fetch_query_cached(source_type: str, conn_name: str, query: str, max_rows=None,
+                       columns=None, sample=None, refresh=False, progress=None, version=None,
+                       optimize=False, stage_above=None):
+    cache, staged_cache = _result_cache(), _staged_cache()
+    key = result_cache_key(source_type, conn_name, query, columns, sample, version=version,
+                           optimize=optimize, max_rows=max_rows)
+    if refresh:
+        cache.invalidate(key)
+        staged_cache.invalidate(key)
+    staged = staged_cache.get(key)
+    if staged is not None:
+        return staged
+    df = cache.get(key)
+    if df is None:
+        if stage_above:
+            # Imported here: staging imports this module
+            from staging import stream_to_stage
+            df = stream_to_stage(source_type, conn_name, query, max_rows, stage_above, progress=progress)
+            if not isinstance(df, pd.DataFrame):
+                staged_cache.put(key, df)
+                return df
+        else:
+            df = fetch_query(source_type, conn_name, query, max_rows, progress=progress)
+        if optimize:
+            df, report = optimize_dtypes(df)
+            attach_memory_report(df, report)
+        df.attrs["result_id"] = result_id(key)
+        cache.put(key, df)
+    return private_copy(df)
+
+def fetch_table_cached(source_type: str, conn_name: str, table_name: str, max_rows=None,
+                       columns=None, sample=None, refresh=False, progress=None, optimize=False,
+                       stage_above=None):
+    query = build_select(table_name, source_type, columns=columns, limit=max_rows, sample=sample)
+    return fetch_query_cached(source_type, conn_name, query, max_rows, columns=columns, sample=sample,
+                              refresh=refresh, progress=progress,
+                              version=table_fingerprint(source_type, conn_name, table_name, refresh),
+                              optimize=optimize, stage_above=stage_above)
+
+# Column names and catalog types of a table, read from DBC.ColumnsV or
+# INFORMATION_SCHEMA.COLUMNS without touching the table itself
+def fetch_table_columns(source_type: str, conn_name: str, table_name: str, refresh=False) -> pd.DataFrame:
+    query, params = build_columns_query(source_type, table_name)
+    cache = _result_cache()
+    key = result_cache_key(source_type, conn_name, query, params=params)
+    if refresh:
+        cache.invalidate(key)
+    columns_df = cache.get(key)
+    if columns_df is None:
+        columns_df = fetch_query(source_type, conn_name, query, params=params)
+        cache.put(key, columns_df)
+    return columns_df
+
+# Column picker shared by the profiling and quality UIs. The picker sits in a
+# form, so nothing is queried while columns are being chosen; the table is only
+# read once "Load" confirms the projection, and later reruns reuse the confirmed
+# one. Stops the page until then. Returns None (load every column) when nothing
+# is selected or the catalog lookup fails.
+def select_columns_ui(source_type: str, conn_name: str, table_name: str, refresh=False):
+    try:
+        columns_df = fetch_table_columns(source_type, conn_name, table_name, refresh)
+    except Exception as e:
+        st.warning(f"Could not read the column list from the catalog, loading all columns: {e}")
+        columns_df = None
+    state_key = f"confirmed_columns:{source_type}:{conn_name}:{table_name}"
+    with st.form("columns_form"):
+        selected = []
+        if columns_df is not None and not columns_df.empty:
+            selected = st.multiselect("Columns to load (leave empty for all)", columns_df["ColumnName"].tolist())
+        if st.form_submit_button("Load"):
+            st.session_state[state_key] = selected
+    if state_key not in st.session_state:
+        st.info("Choose the columns to load and press Load.")
+        st.stop()
+    return st.session_state[state_key] or None
+
+# Stored as plain dicts: pandas compares attrs when combining frames, which a
+# DataFrame value would break
+def attach_memory_report(df: pd.DataFrame, report: pd.DataFrame):
+    df.attrs["memory_report"] = report.to_dict(orient="index")
+
+# Before/after memory of a downcast load, when the frame carries a report
+def memory_report_ui(df: pd.DataFrame):
+    if "memory_report" not in df.attrs:
+        return
+    report = pd.DataFrame.from_dict(df.attrs["memory_report"], orient="index")
+    before, after = report["bytes_before"].sum(), report["bytes_after"].sum()
+    with st.expander(f"💾 Memory optimization: {before / 1024 ** 2:,.1f} MB → {after / 1024 ** 2:,.1f} MB"):
+        st.dataframe(report)
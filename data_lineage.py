@@ -1,11 +1,12 @@
 import streamlit as st
 import re
 import networkx as nx
-import matplotlib.pyplot as plt
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
 import tempfile
 import os
 import pandas as pd
-from connector import get_teradata_connection, get_saved_connections
+from connector import teradata_connection, get_saved_connections
 
 def run_data_lineage_ui():
     # Streamlit UI setup
@@ -23,16 +24,17 @@ def run_data_lineage_ui():
     # Fetch view definition
     def fetch_view_definition(view_name):
         try:
-            connection = get_teradata_connection(selected_conn)
-            if connection is None:
-                st.stop()
-            cursor = connection.cursor()
-            cursor.execute(f"""
-                SELECT RequestText
-                FROM DBC.TablesV
-                WHERE TableKind = 'V' AND TableName = '{view_name}';
-            """)
-            result = cursor.fetchone()
+            with teradata_connection(selected_conn) as connection:
+                if connection is None:
+                    st.stop()
+                cursor = connection.cursor()
+                cursor.execute(f"""
+                    SELECT RequestText
+                    FROM DBC.TablesV
+                    WHERE TableKind = 'V' AND TableName = '{view_name}';
+                """)
+                result = cursor.fetchone()
+                cursor.close()
             if result:
                 return result[0]
         except Exception as e:
@@ -42,16 +44,17 @@ def run_data_lineage_ui():
     # Fetch table metadata
     def fetch_table_metadata(database_name, table_name):
         try:
-            connection = get_teradata_connection(selected_conn)
-            if connection is None:
-                st.stop()
-            cursor = connection.cursor()
-            cursor.execute(f"""
-                SELECT ColumnName, ColumnFormat, ColumnType, ColumnLength, Nullable, CompressValueList
-                FROM DBC.Columns
-                WHERE DatabaseName = '{database_name}' AND TableName = '{table_name}';
-            """)
-            rows = cursor.fetchall()
+            with teradata_connection(selected_conn) as connection:
+                if connection is None:
+                    st.stop()
+                cursor = connection.cursor()
+                cursor.execute(f"""
+                    SELECT ColumnName, ColumnFormat, ColumnType, ColumnLength, Nullable, CompressValueList
+                    FROM DBC.Columns
+                    WHERE DatabaseName = '{database_name}' AND TableName = '{table_name}';
+                """)
+                rows = cursor.fetchall()
+                cursor.close()
             if rows:
                 columns = ['ColumnName', 'ColumnFormat', 'ColumnType', 'ColumnLength', 'Nullable', 'CompressValueList']
                 return pd.DataFrame(rows, columns=columns)
@@ -94,17 +97,19 @@ def run_data_lineage_ui():
             if metadata is not None and not metadata.empty:
                 table_metadata_dict[view_name] = metadata
 
-    # Visualize graph
+    # Visualize graph; drawn on a standalone Figure rather than pyplot, whose
+    # global current-figure state is shared with the profiling render pool
     def visualize_graph(graph):
-        fig, ax = plt.subplots(figsize=(10, 8))
+        fig = Figure(figsize=(10, 8))
+        FigureCanvasAgg(fig)
+        ax = fig.add_subplot()
         pos = nx.spring_layout(graph)
         nx.draw(graph, pos, with_labels=True, node_color='lightblue', edge_color='gray',
                 node_size=2000, font_size=10, arrows=True, ax=ax)
         ax.set_title("Full View Lineage Graph")
 
         temp_file = tempfile.NamedTemporaryFile(delete=False, suffix=".png")
-        plt.savefig(temp_file.name)
-        plt.close()
+        fig.savefig(temp_file.name)
         return temp_file.name
 
     # Input for view name
@@ -1,18 +1,53 @@
 import streamlit as st
 import pandas as pd
-import numpy as np
-import re
-from sklearn.impute import SimpleImputer
-import matplotlib.pyplot as plt
-from scipy.stats import skew, kurtosis, zscore
+from functools import partial
 
 # Import shared connection functions
 from connector import (
-    get_teradata_connection,
-    get_azure_sql_connection,
     get_databricks_catalog,
     get_saved_connections
 )
+from data_fetch import (
+    fetch_table_cached,
+    fetch_query_cached,
+    fetch_table_columns,
+    select_columns_ui,
+    attach_memory_report,
+    memory_report_ui
+)
+from dtype_optimizer import optimize_dtypes
+from file_loader import read_data_file, UPLOAD_TYPES, UPLOAD_LABEL
+from staging import StagedTable, STAGING_THRESHOLD_BYTES
+from profile_stats import (
+    build_profile_query,
+    profile_from_aggregates,
+    supports_profile_pushdown
+)
+from column_profiling import profile_numeric_columns, parallel_count_outliers
+from outliers import outlier_bounds, OUTLIER_METHODS
+from fingerprint import table_fingerprint
+from pipeline import run_pipeline, profiling_stages, memoize
+from imputation import IMPUTATION_STRATEGIES
+from incremental_profile import ProfileState, check_stored_state, profile_state_path, refresh_profile, stream_profile
+from plotting import (
+    correlation_matrix,
+    top_correlated_pairs,
+    plot_histogram,
+    plot_correlation_heatmap,
+    plot_pair,
+    render_cached,
+    render_many,
+    SCATTER_MAX_POINTS,
+    PAIR_PLOT_BINS
+)
+
+# Above this many rows quantiles default to the approximate sketch
+EXACT_QUANTILE_MAX_ROWS = 200_000
+# Row indices listed per column and method when outlier samples are shown
+OUTLIER_SAMPLE_ROWS = 20
+OUTLIER_LABELS = {"zscore": "Z-score Outliers", "iqr": "IQR Outliers", "mad": "MAD Outliers"}
+# Key columns with more distinct values (by sketch estimate) are not counted per value
+KEY_EXACT_MAX_UNIQUE = 1_000_000
 
 def run_data_profiling_ui():
     st.title("🧮 Data Profiling & Visualization")
@@ -21,7 +56,7 @@ def run_data_profiling_ui():
         metadata = []
         for col in df.columns:
             dtype = str(df[col].dtype)
-            if dtype == 'object':
+            if dtype in ('object', 'str', 'string', 'category'):
                 inferred_type = 'VARCHAR(100)'
             elif 'float' in dtype:
                 inferred_type = 'DECIMAL(18,4)'
@@ -41,23 +76,77 @@ def run_data_profiling_ui():
             })
         return pd.DataFrame(metadata)
 
-    def fetch_data_from_teradata(table_name, conn_name):
-        con = get_teradata_connection(conn_name)
-        if con is None:
-            st.stop()
-        query = f"SELECT * FROM {table_name}"
-        df = pd.read_sql(query, con)
-        con.close()
-        return df
-
-    def fetch_data_from_azure_sql(table_name, conn_name):
-        con = get_azure_sql_connection(conn_name)
-        if con is None:
-            st.stop()
-        query = f"SELECT * FROM {table_name}"
-        df = pd.read_sql(query, con)
-        con.close()
-        return df
+    def fetch_data_from_teradata(table_name, conn_name, max_rows=None, columns=None, sample=None, refresh=False, optimize=False):
+        return fetch_table_cached("teradata", conn_name, table_name, max_rows, columns, sample, refresh,
+                                  progress=st.empty(), optimize=optimize, stage_above=STAGING_THRESHOLD_BYTES)
+
+    def fetch_data_from_azure_sql(table_name, conn_name, max_rows=None, columns=None, sample=None, refresh=False, optimize=False):
+        return fetch_table_cached("azuresql", conn_name, table_name, max_rows, columns, sample, refresh,
+                                  progress=st.empty(), optimize=optimize, stage_above=STAGING_THRESHOLD_BYTES)
+
+    def select_sample_spec():
+        sample_mode = st.radio("Sampling", ["Full table", "Row count", "Fraction", "Deterministic hash"], horizontal=True,
+                               help="Sampling runs on the database (Teradata SAMPLE / Azure SQL TABLESAMPLE), so only the sample is transferred.")
+        if sample_mode == "Row count":
+            return ("rows", st.number_input("Sample rows", min_value=1, value=100000, step=10000))
+        if sample_mode == "Fraction":
+            return ("fraction", st.number_input("Sample fraction", min_value=0.0001, max_value=1.0, value=0.01, format="%.4f"))
+        if sample_mode == "Deterministic hash":
+            fraction = st.number_input("Sample fraction", min_value=0.0001, max_value=1.0, value=0.01, format="%.4f")
+            hash_column = st.text_input("Hash column (e.g. the primary key)")
+            return ("hash", fraction, hash_column) if hash_column else None
+        return None
+
+    def profile_in_database(source_type, table_name, conn_name, columns=None, sample=None, refresh=False):
+        columns_df = fetch_table_columns(source_type, conn_name, table_name, refresh)
+        if columns:
+            columns_df = columns_df[columns_df["ColumnName"].isin(columns)]
+        query = build_profile_query(source_type, table_name, columns_df, sample)
+        version = table_fingerprint(source_type, conn_name, table_name, refresh)
+        aggregates = fetch_query_cached(source_type, conn_name, query, refresh=refresh, version=version).iloc[0]
+        return profile_from_aggregates(aggregates, columns_df)
+
+    # Profile of a result too large for memory, computed by batch scans over its staged file
+    def profile_staged_table(staged):
+        st.write(f"{staged.num_rows:,} rows were staged to local disk ({staged.nbytes / 1024 ** 2:,.1f} MB of Parquet).")
+        st.dataframe(staged.head())
+        numerical_cols = staged.numeric_columns()
+        moments, quantile_sketches = memoize((staged.path, "numeric_profile"), lambda: staged.profile_numeric(numerical_cols))
+        quartiles = quantile_sketches.quantiles([0.25, 0.5, 0.75])
+        nulls = memoize((staged.path, "nulls"), staged.null_counts)
+        st.dataframe(pd.DataFrame({"DataType": [str(t) for t in staged.schema.types], "Nulls": nulls.to_numpy()},
+                                  index=staged.columns))
+        st.dataframe(moments.describe(quartiles))
+        st.dataframe(pd.DataFrame({"Skewness": moments.skewness(), "Kurtosis": moments.kurtosis()}, index=numerical_cols))
+        st.write(f"Duplicate rows: {memoize((staged.path, 'duplicates'), staged.duplicate_count):,}")
+        if numerical_cols:
+            bounds = outlier_bounds(moments, quantile_sketches)
+            outlier_counter = memoize((staged.path, "outliers"), lambda: staged.count_outliers(bounds))
+            st.dataframe(outlier_counter.to_frame().rename(columns=OUTLIER_LABELS))
+        histogram_jobs = [
+            ((staged.path, "histogram", col, 20), partial(plot_histogram, *quantile_sketches.histogram(col, bins=20), col))
+            for col in numerical_cols
+        ]
+        for image in render_many(histogram_jobs):
+            st.image(image)
+
+    # Stored mergeable profile of the table; the database is queried on first
+    # use and on refresh, and then only for rows past the stored watermark
+    def profile_incrementally(source_type, table_name, conn_name, watermark_column, columns=None, refresh=False):
+        state_path = profile_state_path(source_type, conn_name, table_name)
+        state = ProfileState.load(state_path)
+        if state is not None:
+            check_stored_state(state, state_path, source_type, watermark_column,
+                               lambda: fetch_table_columns(source_type, conn_name, table_name), columns)
+        if state is None or refresh:
+            state, new_rows = refresh_profile(source_type, conn_name, table_name, watermark_column, columns,
+                                              state_path, progress=st.empty())
+            st.info(f"Merged {new_rows:,} new rows; the profile covers {state.rows:,} rows "
+                    f"up to {state.watermark_column} = {state.watermark}.")
+        else:
+            st.info(f"Stored profile of {state.rows:,} rows up to {state.watermark_column} = {state.watermark}. "
+                    "Press Refresh data to merge newer rows.")
+        return state.profile()
 
     def fetch_data_from_databricks(conn_name):
         catalog_data = get_databricks_catalog(conn_name)
@@ -71,12 +160,32 @@ def run_data_profiling_ui():
     data_source = st.radio("Choose Data Source", ["Upload CSV", "Teradata Table", "Azure SQL DB", "Databricks Catalog"])
 
     df = None
+    staged = None
+    database_profile = None
+    incremental = None
+    streamed = None
+    source_id = None
+    # Pipeline input key: the upload or the fetched result; the sampled frame
+    # fingerprint is used only when neither is known
+    input_key = None
+    optimize = st.checkbox("Optimize memory on load (downcast numbers, compact text columns)")
 
     if data_source == "Upload CSV":
-        st.info("Please upload a CSV file to proceed.")
-        uploaded_file = st.file_uploader("Upload your CSV file", type=["csv"])
+        st.info("Please upload a data file to proceed.")
+        uploaded_file = st.file_uploader(f"Upload your data file ({UPLOAD_LABEL})", type=UPLOAD_TYPES)
         if uploaded_file:
-            df = pd.read_csv(uploaded_file)
+            try:
+                df = read_data_file(uploaded_file)
+            except Exception as e:
+                st.error(f"Could not read {uploaded_file.name}: {e}")
+                st.stop()
+            if optimize:
+                df, report = optimize_dtypes(df)
+                attach_memory_report(df, report)
+            source_id = f"csv:{uploaded_file.name}"
+            # The upload's file id changes with every upload, so with the size it
+            # identifies the whole content without hashing the bytes on each rerun
+            input_key = f"upload:{uploaded_file.file_id}:{uploaded_file.size}:{optimize}"
 
     else:
         source_key_map = {
@@ -92,16 +201,102 @@ def run_data_profiling_ui():
         selected_conn = st.selectbox(f"Select {data_source} Connection", saved_conns)
 
         table_name = st.text_input(f"Enter {data_source} Table Name")
+        source_id = f"{source_key}:{selected_conn}:{table_name}"
+        max_rows = st.number_input("Max rows to load (0 = all)", min_value=0, value=0, step=100000)
+        sample = None
+        pushdown = False
+        streaming = False
+        watermark_column = ""
+        if data_source in ("Teradata Table", "Azure SQL DB"):
+            sample = select_sample_spec()
+            pushdown = st.checkbox("Compute statistics in the database (only aggregates are transferred)")
+            if pushdown and not supports_profile_pushdown(source_key, sample):
+                st.info("Teradata SAMPLE cannot be aggregated in the database; the sampled rows will be loaded instead.")
+                pushdown = False
+            streaming = not pushdown and st.checkbox(
+                "Stream statistics (rows are profiled batch by batch and not kept in memory)")
+            incremental_mode = st.checkbox("Incremental profile (stored mergeable state, only rows past a watermark are fetched)")
+            if incremental_mode:
+                watermark_column = st.text_input(
+                    "Watermark column (load timestamp or increasing ID)",
+                    help="Only rows with a watermark greater than the stored one are fetched, so rows loaded later "
+                         "with a value equal to it are missed; use a column that strictly increases across loads.")
+            if incremental_mode and not watermark_column:
+                st.info("Enter the watermark column to build the incremental profile.")
+                st.stop()
+        refresh = st.button("🔄 Refresh data")
         if table_name:
             try:
                 if data_source == "Teradata Table":
-                    df = fetch_data_from_teradata(table_name, selected_conn)
+                    columns = select_columns_ui("teradata", selected_conn, table_name, refresh)
+                    if watermark_column:
+                        incremental = profile_incrementally("teradata", table_name, selected_conn, watermark_column, columns, refresh)
+                    elif pushdown:
+                        database_profile = profile_in_database("teradata", table_name, selected_conn, columns, sample, refresh)
+                    elif streaming:
+                        streamed = stream_profile("teradata", selected_conn, table_name, columns, sample, max_rows,
+                                                  refresh, progress=st.empty())
+                    else:
+                        df = fetch_data_from_teradata(table_name, selected_conn, max_rows, columns, sample, refresh, optimize)
                 elif data_source == "Azure SQL DB":
-                    df = fetch_data_from_azure_sql(table_name, selected_conn)
+                    columns = select_columns_ui("azuresql", selected_conn, table_name, refresh)
+                    if watermark_column:
+                        incremental = profile_incrementally("azuresql", table_name, selected_conn, watermark_column, columns, refresh)
+                    elif pushdown:
+                        database_profile = profile_in_database("azuresql", table_name, selected_conn, columns, sample, refresh)
+                    elif streaming:
+                        streamed = stream_profile("azuresql", selected_conn, table_name, columns, sample, max_rows,
+                                                  refresh, progress=st.empty())
+                    else:
+                        df = fetch_data_from_azure_sql(table_name, selected_conn, max_rows, columns, sample, refresh, optimize)
                 elif data_source == "Databricks Catalog":
                     fetch_data_from_databricks(selected_conn)
             except Exception as e:
                 st.error(f"Error fetching data: {e}")
+        if isinstance(df, StagedTable):
+            staged, df = df, None
+        elif df is not None:
+            input_key = df.attrs.get("result_id")
+
+    if database_profile is not None:
+        st.subheader("🗄️ In-Database Profile")
+        st.markdown("""
+    **🗄️ In-Database Profile**
+    - - Computes counts, nulls, distinct counts, min, max, mean and standard deviation in one aggregate query.
+    - - Derives skewness and kurtosis from power sums returned by the database.
+    - - Only the single aggregate row is transferred, no table rows are loaded.
+    """)
+        st.dataframe(database_profile)
+
+    if incremental is not None:
+        st.subheader("♻️ Incremental Profile")
+        st.markdown("""
+    **♻️ Incremental Profile**
+    - - Keeps moments, quantile sketches, HyperLogLog distinct counts and top-k values as mergeable state on disk.
+    - - Each refresh fetches only rows whose watermark column is past the stored high-watermark and merges them in.
+    - - Counts, nulls and moments are exact; quartiles, distinct counts and top values are sketch estimates.
+    """)
+        st.dataframe(incremental)
+
+    if streamed is not None:
+        st.subheader("🌊 Streamed Profile")
+        st.markdown("""
+    **🌊 Streamed Profile**
+    - - Fetches the table in fixed-size batches and folds each batch into moments and sketches, so memory holds one batch.
+    - - Counts, nulls and moments are exact; quartiles, distinct counts and top values are sketch estimates.
+    - - No rows are kept, so type conversions, imputation and plots are skipped.
+    """)
+        st.dataframe(streamed)
+
+    if staged is not None:
+        st.subheader("💽 Out-of-Core Profile")
+        st.markdown("""
+    **💽 Out-of-Core Profile**
+    - - Used automatically when a fetch outgrows worker memory; the rows are staged as Parquet on local disk.
+    - - Statistics, null and duplicate counts, outliers and histograms are computed by scanning the file in batches.
+    - - Type conversions, imputation and scatter plots need the data in memory and are skipped.
+    """)
+        profile_staged_table(staged)
 
     if df is not None:
         st.subheader("📊 Original Data Preview")
@@ -111,6 +306,7 @@ def run_data_profiling_ui():
     - - Helps verify the structure and content of the loaded data.
     """)
         st.dataframe(df.head())
+        memory_report_ui(df)
 
         st.subheader("🗾 Inferred Metadata")
         st.markdown("""
@@ -122,86 +318,77 @@ def run_data_profiling_ui():
         metadata_df = fetch_metadata_from_csv(df)
         st.dataframe(metadata_df)
 
-        conversion_summary = {}
+        # Cleaning runs as cached stages keyed by the input fingerprint and stage
+        # settings, so reruns reuse every stage whose inputs did not change
+        imputation = st.selectbox("Imputation strategy for numeric columns", IMPUTATION_STRATEGIES)
+        fill_value = st.number_input("Constant fill value", value=0.0) if imputation == "constant" else None
+        impute_by = [] if imputation == "constant" else st.multiselect(
+            "Impute within groups of (optional)", df.columns.tolist())
+        df, stage_info, data_fingerprint = run_pipeline(df, profiling_stages(source_id, imputation, fill_value, impute_by),
+                                                         input_key)
+        conversion_summary = stage_info["conversions"]["summary"]
+        distinct_counters = stage_info["conversions"]["distinct"]
 
         st.subheader("📅 Date Conversion")
         st.markdown("""
     **📅 Date Conversion**
-    - - Converts columns with 'date' in their name to datetime format.
-    - - Uses `pd.to_datetime` with error coercion.
+    - - Converts columns with 'date' in their name, or whose values parse as dates, to datetime format.
+    - - Infers an explicit format from a sample and caches it per source and column for later loads.
+    - - Uses `pd.to_datetime` with the inferred format and error coercion.
     - - Summarizes converted columns in JSON format.
     """)
-        for col in df.columns:
-            if "date" in col.lower():
-                df[col] = pd.to_datetime(df[col], errors='coerce')
-                conversion_summary[col] = "Converted to datetime"
         st.json({k: v for k, v in conversion_summary.items() if v == "Converted to datetime"})
 
         st.subheader("🔘 Boolean Conversion")
         st.markdown("""
     **🔘 Boolean Conversion**
     - - Detects columns with values like 'yes', 'no', 'true', 'false', '0', '1'.
-    - - Converts them to boolean type using mapping logic.
+    - - Converts them to boolean type with vectorized string operations.
     - - Displays conversion summary in JSON format.
     """)
-        for col in df.select_dtypes(include='object').columns:
-            unique_vals = df[col].dropna().unique()
-            if set(map(str.lower, map(str, unique_vals))).issubset({'yes', 'no', 'true', 'false', '0', '1'}):
-                df[col] = df[col].map(lambda x: str(x).strip().lower() in ['yes', 'true', '1'])
-                conversion_summary[col] = "Converted to boolean"
         st.json({k: v for k, v in conversion_summary.items() if v == "Converted to boolean"})
 
         st.subheader("🏷️ Category Conversion")
         st.markdown("""
     **🏷️ Category Conversion**
     - - Converts object-type columns with ≤ 20 unique values to categorical type.
+    - - Counting stops as soon as a column exceeds 20 unique values.
     - - Skips columns already converted to boolean.
     - - Updates conversion summary in JSON format.
     """)
-        for col in df.select_dtypes(include='object').columns:
-            if df[col].nunique() <= 20 and col not in conversion_summary:
-                df[col] = df[col].astype('category')
-                conversion_summary[col] = "Converted to category"
         st.json({k: v for k, v in conversion_summary.items() if v == "Converted to category"})
 
         st.subheader("🔢 Symbolic Numeric Parsing")
         st.markdown("""
     **🔢 Symbolic Numeric Parsing**
-    - - Identifies object columns with symbols like $, %, ,.
+    - - Identifies object columns with symbols like $, %, , in a sample of their values.
     - - Removes symbols using regex and converts to numeric.
     - - Adds conversion details to summary in JSON format.
     """)
-        for col in df.columns:
-            if df[col].dtype == 'object':
-                sample_vals = df[col].dropna().astype(str).head(10)
-                if sample_vals.apply(lambda x: bool(re.search(r'[$%,]', x))).any():
-                    df[col] = df[col].replace('[$%,]', '', regex=True)
-                    df[col] = pd.to_numeric(df[col], errors='coerce')
-                    conversion_summary[col] = "Parsed numeric values with symbols"
         st.json({k: v for k, v in conversion_summary.items() if v == "Parsed numeric values with symbols"})
 
         st.subheader("🧮 Missing Value Imputation")
         st.markdown("""
     **🧮 Missing Value Imputation**
-    - - Applies mean imputation to numeric columns using `SimpleImputer`.
-    - - Replaces missing values with column mean.
-    - - Ensures completeness of numeric data.
+    - - Fills missing numeric values with the column mean, median, mode or a constant, optionally within groups.
+    - - Means and medians come from the same one-pass profiling accumulators as the statistics below.
+    - - Only columns with missing values are rewritten, keeping their dtype where the fill values fit.
     """)
-        numeric_columns = df.select_dtypes(include=['float64', 'int64']).columns
-        imputer = SimpleImputer(strategy='mean')
-        df[numeric_columns] = imputer.fit_transform(df[numeric_columns])
-        st.write("Missing values in numeric columns have been imputed with mean.")
+        numerical_cols = stage_info["imputation"]["columns"]
+        imputation_report = stage_info["imputation"]["report"]
+        if imputation_report.empty:
+            st.write("No missing values in numeric columns.")
+        else:
+            st.write(f"Missing values in numeric columns have been imputed with {imputation}.")
+            st.dataframe(imputation_report)
 
         st.subheader("🧹 Duplicate Removal")
         st.markdown("""
     **🧹 Duplicate Removal**
-    - - Removes duplicate rows using `drop_duplicates`.
+    - - Removes duplicate rows found by hashing each row, with candidate groups verified value by value.
     - - Displays count of removed duplicates.
     """)
-        before = len(df)
-        df = df.drop_duplicates()
-        after = len(df)
-        st.write(f"Removed {before - after} duplicate rows.")
+        st.write(f"Removed {stage_info['deduplication']} duplicate rows.")
 
         st.subheader("🔄 Conversion Summary")
         st.json(conversion_summary)
@@ -209,21 +396,25 @@ def run_data_profiling_ui():
         st.subheader("📈 Descriptive Statistics")
         st.markdown("""
     **📈 Descriptive Statistics**
-    - - Displays statistical summary using `df.describe()`.
-    - - Includes count, mean, std, min, max, and quartiles.
+    - - Accumulates count, mean, moments, min and max in one vectorized pass, with column chunks profiled in parallel.
+    - - Includes count, mean, std, min, max, and quartiles from a mergeable quantile sketch.
     """)
-        st.dataframe(df.describe())
+        exact_quantiles = st.checkbox("Exact quantiles", value=len(df) <= EXACT_QUANTILE_MAX_ROWS,
+                                      help="Exact quantiles keep every value; otherwise a KLL sketch (~1% rank error) is used.")
+        # Columns are split into chunks profiled concurrently in one scan each
+        moments, quantile_sketches = memoize((data_fingerprint, "numeric_profile", exact_quantiles),
+                                             lambda: profile_numeric_columns(df, numerical_cols, exact_quantiles))
+        quartiles = quantile_sketches.quantiles([0.25, 0.5, 0.75])
+        st.dataframe(moments.describe(quartiles))
 
         st.subheader("📐 Skewness and Kurtosis")
         st.markdown("""
     **Skewness and Kurtosis**
     - - Skewness shows how symmetric the data distribution is.
     - - Kurtosis indicates the presence of outliers and the sharpness of the peak.
+    - - Both are derived from the accumulated moments, no extra pass over the data.
     """)
-        numerical_cols = numeric_columns.tolist()
-        for col in numerical_cols:
-            col_skew = skew(df[col])
-            col_kurt = kurtosis(df[col])
+        for col, col_skew, col_kurt in zip(numerical_cols, moments.skewness(), moments.kurtosis()):
             st.write(f"{col}: Skewness = {col_skew:.2f}, Kurtosis = {col_kurt:.2f}")
 
         st.subheader("📊 Histograms")
@@ -231,49 +422,61 @@ def run_data_profiling_ui():
     **📊 Histograms**
     - - Plots distribution of each numeric column using histograms.
     - - Reveals modality, spread, and skewness visually.
-    - - Uses `matplotlib` for rendering histograms.
+    - - Bins come from the quantile sketch, so no extra pass over the data is needed.
+    - - Uses `matplotlib` for rendering histograms; plots are rendered in parallel and cached until the data changes.
     """)
-        for col in numerical_cols:
-            fig, ax = plt.subplots()
-            df[col].dropna().hist(bins=20, ax=ax, color='skyblue', edgecolor='black')
-            ax.set_title(f'Distribution of {col}')
-            st.pyplot(fig)
+        # Rendered plots are cached by pipeline output key, column and plot parameters
+        histogram_jobs = [
+            ((data_fingerprint, "histogram", col, 20, exact_quantiles),
+             partial(plot_histogram, *quantile_sketches.histogram(col, bins=20), col))
+            for col in numerical_cols
+        ]
+        for image in render_many(histogram_jobs):
+            st.image(image)
 
         st.subheader("📉 Scatter Plots")
         st.markdown("""
     **📉 Scatter Plots**
-    - - Generates scatter plots for all pairs of numeric columns.
-    - - Helps visualize relationships and correlations between variables.
-    - - Useful for detecting linear or non-linear patterns.
+    - - Shows a correlation heatmap of all numeric columns, computed in one vectorized pass.
+    - - Plots only the most strongly correlated pairs, chosen by absolute correlation.
+    - - Large pairs are drawn as 2D-binned density plots so rendering time does not grow with row count.
     """)
-        for i in range(len(numerical_cols)):
-            for j in range(i + 1, len(numerical_cols)):
-                fig, ax = plt.subplots()
-                ax.scatter(df[numerical_cols[i]], df[numerical_cols[j]], alpha=0.5)
-                ax.set_xlabel(numerical_cols[i])
-                ax.set_ylabel(numerical_cols[j])
-                ax.set_title(f'{numerical_cols[i]} vs {numerical_cols[j]}')
-                st.pyplot(fig)
+        if len(numerical_cols) >= 2:
+            corr = memoize((data_fingerprint, "correlation"), lambda: correlation_matrix(df, numerical_cols, moments))
+            st.image(render_cached((data_fingerprint, "correlation", tuple(numerical_cols)),
+                                   partial(plot_correlation_heatmap, corr)))
+            pair_count = len(numerical_cols) * (len(numerical_cols) - 1) // 2
+            top_k = st.slider("Pairs to plot (strongest correlations)", 0, min(pair_count, 50), min(pair_count, 6))
+            top_pairs = top_correlated_pairs(corr, top_k)
+            pair_jobs = [
+                ((data_fingerprint, "pair", x_col, y_col, SCATTER_MAX_POINTS, PAIR_PLOT_BINS),
+                 partial(plot_pair, df, x_col, y_col))
+                for x_col, y_col, _ in top_pairs
+            ]
+            for (x_col, y_col, r), image in zip(top_pairs, render_many(pair_jobs)):
+                st.write(f"{x_col} vs {y_col}: r = {r:.2f}")
+                st.image(image)
 
         st.subheader("🚨 Outlier Detection")
         st.markdown("""
     **🚨 Outlier Detection**
-    - - Detects outliers using Z-score and IQR methods.
+    - - Detects outliers using Z-score, IQR and MAD methods in one vectorized pass, without copying rows.
     - - Z-score method flags values with |z| > 3.
     - - IQR method flags values outside 1.5×IQR range.
-    - - Displays count of outliers per column for both methods.
+    - - MAD method flags values with modified z-score 0.6745·|x − median| / MAD > 3.5.
+    - - Displays count of outliers per column for each method, optionally with sample row indices.
     """)
-        z_scores = df[numerical_cols].apply(zscore)
-        z_outliers = (np.abs(z_scores) > 3)
-        for col in numerical_cols:
-            st.write(f"{col}: Z-score Outliers = {z_outliers[col].sum()}")
-
-        for col in numerical_cols:
-            Q1 = df[col].quantile(0.25)
-            Q3 = df[col].quantile(0.75)
-            IQR = Q3 - Q1
-            outliers = df[(df[col] < Q1 - 1.5 * IQR) | (df[col] > Q3 + 1.5 * IQR)]
-            st.write(f"{col}: IQR Outliers = {len(outliers)}")
+        sample_limit = OUTLIER_SAMPLE_ROWS if st.checkbox("Show sample row indices of outliers") else 0
+        if numerical_cols:
+            bounds = outlier_bounds(moments, quantile_sketches)
+            outlier_counter = memoize((data_fingerprint, "outliers", exact_quantiles, sample_limit),
+                                      lambda: parallel_count_outliers(df, bounds, sample_limit))
+            st.dataframe(outlier_counter.to_frame().rename(columns=OUTLIER_LABELS))
+            if sample_limit:
+                for method in OUTLIER_METHODS:
+                    st.write(f"{OUTLIER_LABELS[method]}: sample row indices")
+                    st.json({col: outlier_counter.sample_indices(method, col).tolist() for col in numerical_cols
+                             if outlier_counter.counts[method][numerical_cols.index(col)]}, expanded=False)
 
         st.subheader("🔍 Referential Integrity Checks")
         st.markdown("""
@@ -285,7 +488,15 @@ def run_data_profiling_ui():
         if "Sale_ID" in df.columns:
             st.write(f"Duplicate Sale_IDs: {df['Sale_ID'].duplicated().sum()}")
         if "Agent_ID" in df.columns:
-            agent_sales_counts = df['Agent_ID'].value_counts()
-            st.write(f"Unique Agent_IDs: {df['Agent_ID'].nunique()}")
-            st.write(f"Agents handling multiple sales: {agent_sales_counts[agent_sales_counts > 1].count()}")
+            # The distinct-count sketch from the conversion scan decides whether
+            # the per-agent counts are small enough to build exactly
+            agents = distinct_counters.get("Agent_ID")
+            unique_agents = agents.count() if agents is not None else None
+            if unique_agents is None or unique_agents <= KEY_EXACT_MAX_UNIQUE:
+                agent_sales_counts = df['Agent_ID'].value_counts()
+                st.write(f"Unique Agent_IDs: {len(agent_sales_counts)}")
+                st.write(f"Agents handling multiple sales: {agent_sales_counts[agent_sales_counts > 1].count()}")
+            else:
+                st.write(f"Unique Agent_IDs: ~{unique_agents:,.0f} (HyperLogLog estimate)")
+                st.write(f"Agents handling multiple sales: not counted above {KEY_EXACT_MAX_UNIQUE:,} agents.")
 
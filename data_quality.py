@@ -1,22 +1,61 @@
 import streamlit as st
 import pandas as pd
 from connector import (
-    get_teradata_connection,
-    get_azure_sql_connection,
     get_databricks_catalog,
     get_saved_connections
 )
+from data_fetch import fetch_table_cached, select_columns_ui, attach_memory_report, memory_report_ui
+from dtype_optimizer import optimize_dtypes
+from duplicates import duplicate_summary
+from file_loader import read_data_file, UPLOAD_TYPES, UPLOAD_LABEL
+from staging import StagedTable, STAGING_THRESHOLD_BYTES, STAGED_SAMPLE_ROWS
+
+# Leading rows of a staged table used for the data type check
+TYPE_CHECK_SAMPLE_ROWS = 10_000
+
+# Column pickers of the check configuration, for a DataFrame or a StagedTable.
+# Returns (null check columns, duplicate key columns, {column: expected type},
+# {column: (min, max)}).
+def configure_checks(df):
+    columns = list(df.columns)
+    null_check_cols = st.multiselect("Select columns for Null Check", columns)
+
+    st.markdown("### Duplicate Check")
+    duplicate_key_cols = st.multiselect("Key columns for duplicate check (leave empty for all columns)", columns)
+
+    st.markdown("### Data Type Validation")
+    type_check_cols = st.multiselect("Select columns for Type Check", columns)
+    expected_types = {}
+    for col in type_check_cols:
+        expected_types[col] = st.selectbox(f"Expected type for {col}", ["int", "float", "str", "date", "datetime", "timestamp", "bool"], key=f"type_{col}")
+
+    st.markdown("### Range Validation")
+    range_check_cols = st.multiselect("Select columns for Range Check", columns)
+    range_rules = {}
+    for col in range_check_cols:
+        min_val = st.number_input(f"Min value for {col}", key=f"min_{col}")
+        max_val = st.number_input(f"Max value for {col}", key=f"max_{col}")
+        range_rules[col] = (min_val, max_val)
+    return null_check_cols, duplicate_key_cols, expected_types, range_rules
 
 def run_data_quality_ui():
     st.title("Data Quality Checks")
 
     data_source = st.radio("Choose Data Source", ["Upload CSV", "Teradata Table", "Azure SQL DB", "Databricks Catalog"])
     df = None
+    optimize = st.checkbox("Optimize memory on load (downcast numbers, compact text columns)")
 
     if data_source == "Upload CSV":
-        uploaded_file = st.file_uploader("Upload a CSV file", type=["csv"])
+        uploaded_file = st.file_uploader(f"Upload a data file ({UPLOAD_LABEL})", type=UPLOAD_TYPES)
         if uploaded_file:
-            df = pd.read_csv(uploaded_file)
+            try:
+                df = read_data_file(uploaded_file)
+            except Exception as e:
+                st.error(f"Could not read {uploaded_file.name}: {e}")
+                st.stop()
+            if optimize:
+                df, report = optimize_dtypes(df)
+                attach_memory_report(df, report)
         else:
             st.stop()
     else:
@@ -32,22 +71,15 @@ def run_data_quality_ui():
             st.stop()
         selected_conn = st.selectbox(f"Select {data_source} Connection", saved_conns)
         table_name = st.text_input(f"Enter {data_source} Table Name")
+        max_rows = st.number_input("Max rows to load (0 = all)", min_value=0, value=0, step=100000)
+        refresh = st.button("🔄 Refresh data")
         if table_name:
             try:
-                if data_source == "Teradata Table":
-                    con = get_teradata_connection(selected_conn)
-                    if con is None:
-                        st.stop()
-                    query = f"SELECT * FROM {table_name}"
-                    df = pd.read_sql(query, con)
-                    con.close()
-                elif data_source == "Azure SQL DB":
-                    con = get_azure_sql_connection(selected_conn)
-                    if con is None:
-                        st.stop()
-                    query = f"SELECT * FROM {table_name}"
-                    df = pd.read_sql(query, con)
-                    con.close()
+                if data_source in ("Teradata Table", "Azure SQL DB"):
+                    columns = select_columns_ui(source_key, selected_conn, table_name, refresh)
+                    df = fetch_table_cached(source_key, selected_conn, table_name, max_rows, columns,
+                                            refresh=refresh, progress=st.empty(), optimize=optimize,
+                                            stage_above=STAGING_THRESHOLD_BYTES)
                 elif data_source == "Databricks Catalog":
                     catalog_data = get_databricks_catalog(selected_conn)
                     if catalog_data:
@@ -62,34 +94,26 @@ def run_data_quality_ui():
         else:
             st.stop()
 
+    # Results too large for memory are staged on local disk and checked by batch scans
+    staged = df if isinstance(df, StagedTable) else None
+
     st.write("### Preview of Data")
     st.dataframe(df.head())
+    memory_report_ui(df)
+    if staged is not None:
+        st.info(f"{staged.num_rows:,} rows were staged to local disk; checks run as out-of-core scans "
+                f"and list at most {STAGED_SAMPLE_ROWS:,} offending rows.")
 
     # Move test configuration to main UI
     st.markdown("## Configure Data Quality Checks")
 
-    null_check_cols = st.multiselect("Select columns for Null Check", df.columns.tolist())
-
-    st.markdown("### Data Type Validation")
-    type_check_cols = st.multiselect("Select columns for Type Check", df.columns.tolist())
-    expected_types = {}
-    for col in type_check_cols:
-        expected_types[col] = st.selectbox(f"Expected type for {col}", ["int", "float", "str", "date", "datetime", "timestamp", "bool"], key=f"type_{col}")
-
-    st.markdown("### Range Validation")
-    range_check_cols = st.multiselect("Select columns for Range Check", df.columns.tolist())
-    range_rules = {}
-    for col in range_check_cols:
-        min_val = st.number_input(f"Min value for {col}", key=f"min_{col}")
-        max_val = st.number_input(f"Max value for {col}", key=f"max_{col}")
-        range_rules[col] = (min_val, max_val)
+    null_check_cols, duplicate_key_cols, expected_types, range_rules = configure_checks(df)
 
     def check_nulls(df, columns):
         return df[columns].isnull().sum()
 
-    def check_duplicates(df):
-        dupdf = df[df.duplicated(keep=False)].groupby(list(df.columns)).size().reset_index(name='dup_count')
-        return dupdf
+    def check_duplicates(df, key_cols):
+        return duplicate_summary(df, subset=key_cols or None)
 
     def check_data_types(df, expected_types):
         mismatches = {}
@@ -116,13 +140,16 @@ def run_data_quality_ui():
     if st.button("Run Data Quality Checks"):
         st.subheader("Null Value Check")
         if null_check_cols:
-            nulls = check_nulls(df, null_check_cols)
+            nulls = staged.null_counts(null_check_cols) if staged is not None else check_nulls(df, null_check_cols)
             st.write(nulls)
         else:
             st.write("No columns selected for null check.")
 
         st.subheader("Duplicate Records")
-        duplicates = check_duplicates(df)
+        if staged is not None:
+            duplicates = staged.duplicate_groups(subset=duplicate_key_cols or None)
+        else:
+            duplicates = check_duplicates(df, duplicate_key_cols)
         if not duplicates.empty:
             st.write(duplicates)
         else:
@@ -130,7 +157,9 @@ def run_data_quality_ui():
 
         st.subheader("Data Type Validation")
         if expected_types:
-            type_mismatches = check_data_types(df, expected_types)
+            # Staged tables are type-checked on a leading sample of rows
+            type_frame = staged.head(TYPE_CHECK_SAMPLE_ROWS) if staged is not None else df
+            type_mismatches = check_data_types(type_frame, expected_types)
             if type_mismatches:
                 st.write(type_mismatches)
             else:
@@ -140,11 +169,15 @@ def run_data_quality_ui():
 
         st.subheader("Range Validation")
         if range_rules:
-            range_violations = check_ranges(df, range_rules)
-            if range_violations:
+            if staged is not None:
+                range_violations = staged.range_violations(range_rules)
+                for col, (rows, count) in range_violations.items():
+                    st.write(f"Violations in {col} ({count:,} rows):", rows)
+            else:
+                range_violations = check_ranges(df, range_rules)
                 for col, result in range_violations.items():
                     st.write(f"Violations in {col}:", result)
-            else:
+            if not range_violations:
                 st.write("All values within specified ranges.")
         else:
             st.write("No columns selected for range validation.")
@@ -0,0 +1,58 @@
+import numpy as np
+import pandas as pd
+from sketches import count_distinct_upto
+
+# Text columns whose distinct values stay within both limits become categories;
+# other all-string columns become Arrow-backed strings
+CATEGORY_MAX_UNIQUE = 10_000
+CATEGORY_MAX_RATIO = 0.5
+
+# Smallest integer type holding every value; floats drop to float32 only when
+# every value round-trips exactly
+def downcast_numeric(series: pd.Series) -> pd.Series:
+    if series.empty:
+        return series
+    if pd.api.types.is_integer_dtype(series.dtype) and isinstance(series.dtype, np.dtype):
+        return pd.to_numeric(series, downcast="unsigned" if series.min() >= 0 else "integer")
+    if series.dtype == np.float64:
+        values = series.to_numpy()
+        narrowed = values.astype(np.float32)
+        with np.errstate(over="ignore", invalid="ignore"):
+            if np.array_equal(narrowed.astype(np.float64), values, equal_nan=True):
+                return pd.Series(narrowed, index=series.index, name=series.name)
+    return series
+
+def compact_text(series: pd.Series, max_unique=CATEGORY_MAX_UNIQUE, max_ratio=CATEGORY_MAX_RATIO) -> pd.Series:
+    if not (series.dtype == object or isinstance(series.dtype, pd.StringDtype)) or series.empty:
+        return series
+    if pd.api.types.infer_dtype(series, skipna=True) != "string":
+        return series
+    limit = min(max_unique, int(series.count() * max_ratio))
+    if count_distinct_upto(series, limit) is not None:
+        return series.astype("category")
+    if isinstance(series.dtype, pd.StringDtype):
+        return series
+    return series.astype(pd.StringDtype("pyarrow"))
+
+# Narrow numeric and text columns in place. Returns the frame and a per-column
+# report of dtypes and memory (bytes) before and after.
+def optimize_dtypes(df: pd.DataFrame, max_unique=CATEGORY_MAX_UNIQUE, max_ratio=CATEGORY_MAX_RATIO):
+    before = df.memory_usage(index=False, deep=True)
+    dtypes_before = df.dtypes.astype(str)
+    for col in df.columns:
+        series = df[col]
+        if pd.api.types.is_numeric_dtype(series.dtype) and not pd.api.types.is_bool_dtype(series.dtype):
+            optimized = downcast_numeric(series)
+        else:
+            optimized = compact_text(series, max_unique, max_ratio)
+        if optimized is not series:
+            df[col] = optimized
+    after = df.memory_usage(index=False, deep=True)
+    report = pd.DataFrame({
+        "dtype_before": dtypes_before,
+        "dtype_after": df.dtypes.astype(str),
+        "bytes_before": before,
+        "bytes_after": after,
+    })
+    report["saved_pct"] = (1 - report["bytes_after"] / report["bytes_before"].where(report["bytes_before"] > 0)).mul(100).round(1)
+    return df, report
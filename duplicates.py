@@ -0,0 +1,167 @@
+import os
+import numpy as np
+import pandas as pd
+
+# Second hash key (16 bytes) for the upper half of 128-bit row hashes
+SECOND_HASH_KEY = "dua-row-hash-128"
+# Hash partitions (a power of two) used when grouping out-of-core row hashes
+DUPLICATE_PARTITIONS = 16
+
+# Vectorized 64-bit hash of every row over the given columns. A second key
+# gives an independent 64-bit hash, for 128 bits in total.
+def row_hashes(df: pd.DataFrame, subset=None, hash_key=None) -> np.ndarray:
+    frame = df if subset is None else df[list(subset)]
+    if hash_key is None:
+        return pd.util.hash_pandas_object(frame, index=False).to_numpy()
+    return pd.util.hash_pandas_object(frame, index=False, hash_key=hash_key).to_numpy()
+
+def row_hash_pairs(df: pd.DataFrame, subset=None) -> np.ndarray:
+    return np.stack([row_hashes(df, subset), row_hashes(df, subset, SECOND_HASH_KEY)], axis=1)
+
+def _first_rows(codes: np.ndarray, n_groups: int) -> np.ndarray:
+    first = np.empty(n_groups, dtype=np.int64)
+    first[codes[::-1]] = np.arange(len(codes) - 1, -1, -1)
+    return first
+
+# Give the rows in `rows` new group codes from `keys` (an exact grouping of just
+# those rows), so hash collisions split into their true groups
+def _regroup(codes: np.ndarray, rows: np.ndarray, keys) -> np.ndarray:
+    if not len(rows):
+        return codes
+    sub_codes, _ = pd.MultiIndex.from_arrays([codes[rows]] + list(keys)).factorize()
+    codes = codes.copy()
+    codes[rows] = codes.max() + 1 + sub_codes
+    return pd.factorize(codes)[0]
+
+# Element-wise equality of rows and other_rows in one column, NaN equal to NaN
+def _same_as(series: pd.Series, rows: np.ndarray, other_rows: np.ndarray) -> np.ndarray:
+    values = series.array
+    left, right = values.take(rows), values.take(other_rows)
+    equal = left == right
+    equal = equal.to_numpy(dtype=bool, na_value=False) if hasattr(equal, "to_numpy") else np.array(equal, dtype=bool)
+    unequal = np.flatnonzero(~equal)
+    if len(unequal):
+        equal[unequal] = pd.isna(left.take(unequal)) & pd.isna(right.take(unequal))
+    return equal
+
+class DuplicateGroups:
+    # Rows grouped by identical content: codes[i] is the group of row i
+    def __init__(self, codes: np.ndarray):
+        self.codes = codes
+        self.sizes = np.bincount(codes) if len(codes) else np.zeros(0, dtype=np.int64)
+        self.first = _first_rows(codes, len(self.sizes))
+
+    # Same semantics as DataFrame.duplicated(keep="first" / False)
+    def duplicated(self, keep="first") -> np.ndarray:
+        if keep is False:
+            return self.sizes[self.codes] > 1
+        return self.first[self.codes] != np.arange(len(self.codes))
+
+    # Rows that repeat an earlier row: len(df) - len(df.drop_duplicates())
+    @property
+    def duplicate_count(self) -> int:
+        return len(self.codes) - len(self.sizes)
+
+    # First row of every group with more than one row, and the group sizes
+    def repeated_groups(self):
+        groups = np.flatnonzero(self.sizes > 1)
+        return self.first[groups], self.sizes[groups]
+
+# Group rows by 64-bit row hash, then verify only the candidate groups (hash
+# groups with more than one row) against each group's first row:
+#   verify="exact"  compare the values column by column
+#   verify="hash"   compare an independent second 64-bit hash (128 bits total)
+#   verify=None     trust the 64-bit hash
+# Rows that differ from their group's first row are hash collisions and are
+# regrouped exactly. subset restricts the comparison to key columns.
+def find_duplicates(df: pd.DataFrame, subset=None, verify="exact") -> DuplicateGroups:
+    columns = list(df.columns if subset is None else subset)
+    codes = pd.factorize(row_hashes(df, columns))[0].astype(np.int64)
+    groups = DuplicateGroups(codes)
+    if verify is None:
+        return groups
+    candidates = np.flatnonzero(groups.sizes[codes] > 1)
+    candidates = candidates[groups.first[codes[candidates]] != candidates]
+    if not len(candidates):
+        return groups
+    firsts = groups.first[codes[candidates]]
+    if verify == "hash":
+        # Second hash of every row in a candidate group, or of the whole frame
+        # when most rows are in one (cheaper than gathering them first)
+        rows = np.flatnonzero(groups.sizes[codes] > 1)
+        if len(rows) > len(codes) // 2:
+            rows = np.arange(len(codes))
+        position = np.empty(len(codes), dtype=np.int64)
+        position[rows] = np.arange(len(rows))
+        frame = df if len(rows) == len(codes) else df.iloc[rows]
+        second = row_hashes(frame, columns, SECOND_HASH_KEY)
+        same = second[position[candidates]] == second[position[firsts]]
+    else:
+        same = np.ones(len(candidates), dtype=bool)
+        for col in columns:
+            same &= _same_as(df[col], candidates, firsts)
+    collided = candidates[~same]
+    if not len(collided):
+        return groups
+    # Every row of a group with a collision is regrouped exactly
+    rows = np.flatnonzero(np.isin(codes, np.unique(codes[collided])))
+    if verify == "hash":
+        keys = [row_hashes(df.iloc[rows], columns, SECOND_HASH_KEY)]
+    else:
+        keys = [pd.factorize(df[col].iloc[rows], use_na_sentinel=False)[0] for col in columns]
+    return DuplicateGroups(_regroup(codes, rows, keys))
+
+def drop_duplicate_rows(df: pd.DataFrame, subset=None, verify="exact") -> pd.DataFrame:
+    return df[~find_duplicates(df, subset, verify).duplicated()]
+
+# One row per duplicated group (first occurrence, key columns only when a
+# subset is given) with its row count in dup_count
+def duplicate_summary(df: pd.DataFrame, subset=None, verify="exact", max_groups=None) -> pd.DataFrame:
+    columns = list(df.columns if subset is None else subset)
+    first_rows, sizes = find_duplicates(df, columns, verify).repeated_groups()
+    if max_groups is not None:
+        first_rows, sizes = first_rows[:max_groups], sizes[:max_groups]
+    summary = df[columns].iloc[first_rows].reset_index(drop=True)
+    summary["dup_count"] = sizes
+    return summary
+
+class HashPartitions:
+    # 128-bit row hashes spilled to one file per partition, chosen by the top
+    # bits of the first hash. Equal rows always land in the same partition, so
+    # partitions are grouped one at a time and memory holds only one of them.
+    def __init__(self, directory: str, partitions=DUPLICATE_PARTITIONS):
+        self.paths = [os.path.join(directory, f"hashes-{i}.bin") for i in range(partitions)]
+        self.files = [open(path, "wb") for path in self.paths]
+        self.shift = np.uint64(64 - int(np.log2(partitions)))
+
+    def add(self, pairs: np.ndarray):
+        part = (pairs[:, 0] >> self.shift).astype(np.intp) if self.shift < 64 else np.zeros(len(pairs), dtype=np.intp)
+        order = np.argsort(part, kind="stable")
+        bounds = np.searchsorted(part[order], np.arange(len(self.files) + 1))
+        for i, handle in enumerate(self.files):
+            handle.write(np.ascontiguousarray(pairs[order[bounds[i]:bounds[i + 1]]]).tobytes())
+
+    def __iter__(self):
+        self.close()
+        for path in self.paths:
+            yield np.fromfile(path, dtype=np.uint64).reshape(-1, 2)
+
+    def close(self):
+        for handle in self.files:
+            handle.close()
+
+# Duplicate count and {(hash, hash2): rows} for up to max_groups repeated
+# groups, from hash pairs spilled to partitions
+def partitioned_duplicates(partitions: HashPartitions, max_groups=None):
+    duplicate_rows = 0
+    repeated = {}
+    for pairs in partitions:
+        if not len(pairs):
+            continue
+        keys, sizes = np.unique(pairs, axis=0, return_counts=True)
+        duplicate_rows += len(pairs) - len(keys)
+        for key, size in zip(keys[sizes > 1], sizes[sizes > 1]):
+            if max_groups is not None and len(repeated) >= max_groups:
+                break
+            repeated[(int(key[0]), int(key[1]))] = int(size)
+    return duplicate_rows, repeated
@@ -0,0 +1,84 @@
+import os
+import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+import pyarrow.feather as feather
+import pyarrow.ipc as ipc
+import pyarrow.parquet as pq
+from data_fetch import arrow_to_frame
+
+# Extensions accepted by the upload widgets
+UPLOAD_TYPES = ["csv", "gz", "zst", "parquet", "feather", "arrow", "ipc"]
+UPLOAD_LABEL = "CSV (optionally .gz / .zst), Parquet, Feather or Arrow IPC"
+
+# Bytes parsed per CSV block; blocks are parsed in parallel on Arrow's thread pool
+CSV_BLOCK_SIZE = 16 * 1024 ** 2
+
+COMPRESSION_SUFFIXES = {".gz": "gzip", ".zst": "zstd"}
+FORMAT_SUFFIXES = {
+    ".csv": "csv",
+    ".parquet": "parquet",
+    ".feather": "arrow",
+    ".arrow": "arrow",
+    ".ipc": "arrow",
+}
+
+# (format, compression) from a file name such as "sales.csv.gz"
+def file_format(name: str):
+    root, suffix = os.path.splitext(name.lower())
+    compression = COMPRESSION_SUFFIXES.get(suffix)
+    if compression:
+        root, suffix = os.path.splitext(root)
+    file_type = FORMAT_SUFFIXES.get(suffix)
+    if file_type is None or (compression and file_type != "csv"):
+        raise ValueError(f"Unsupported file type: {name}")
+    return file_type, compression
+
+# Random-access source without copying the data: files on disk are memory
+# mapped, and in-memory uploads (Streamlit's UploadedFile is a BytesIO) are
+# wrapped as an Arrow buffer over their existing bytes
+def open_source(source):
+    if isinstance(source, (str, os.PathLike)):
+        return pa.memory_map(os.fspath(source))
+    if hasattr(source, "getbuffer"):
+        return pa.BufferReader(pa.py_buffer(source.getbuffer()))
+    return pa.PythonFile(source, mode="r")
+
+def read_csv_table(source, compression=None) -> pa.Table:
+    # Compressed input is decompressed as a stream while it is parsed. Empty and
+    # NA-like string cells become nulls, as pandas.read_csv reads them.
+    stream = pa.input_stream(source, compression=compression)
+    return pa_csv.read_csv(
+        stream,
+        read_options=pa_csv.ReadOptions(use_threads=True, block_size=CSV_BLOCK_SIZE),
+        convert_options=pa_csv.ConvertOptions(strings_can_be_null=True, quoted_strings_can_be_null=True),
+    )
+
+def read_ipc_table(source) -> pa.Table:
+    try:
+        # Feather v2 is the Arrow IPC file format; uncompressed columns are
+        # referenced in place rather than copied
+        return feather.read_table(source, memory_map=isinstance(source, (str, os.PathLike)))
+    except pa.ArrowInvalid:
+        # IPC stream format (no footer)
+        if isinstance(source, pa.NativeFile):
+            source.seek(0)
+        return ipc.open_stream(source).read_all()
+
+# Read a data file (path or uploaded file object) into an Arrow table
+def read_arrow_table(source, name=None) -> pa.Table:
+    name = name or getattr(source, "name", None) or os.fspath(source)
+    file_type, compression = file_format(name)
+    if file_type == "arrow" and isinstance(source, (str, os.PathLike)):
+        return read_ipc_table(source)
+    handle = open_source(source)
+    if file_type == "csv":
+        return read_csv_table(handle, compression)
+    if file_type == "parquet":
+        return pq.read_table(handle, memory_map=True)
+    return read_ipc_table(handle)
+
+# Arrow-backed DataFrame; the Arrow table is released column by column while
+# converting, so the load never holds two full copies of the decoded data
+def read_data_file(source, name=None) -> pd.DataFrame:
+    return arrow_to_frame(read_arrow_table(source, name), date_as_object=False)
@@ -0,0 +1,91 @@
+import hashlib
+import numpy as np
+import pandas as pd
+from connector import pooled_connection, get_saved_connection_key
+from result_cache import LRUCache
+
+# Rows hashed per frame fingerprint, spread evenly over the frame
+FINGERPRINT_SAMPLE_ROWS = 4096
+# Table fingerprints are reused for this many seconds, so reruns do not hit the catalog
+TABLE_FINGERPRINT_TTL = 60
+TABLE_FINGERPRINT_MAX_ENTRIES = 1024
+
+_table_fingerprints = LRUCache(ttl=TABLE_FINGERPRINT_TTL, max_entries=TABLE_FINGERPRINT_MAX_ENTRIES)
+
+# Cheap, stable identity of an in-memory frame: schema, shape and vectorized
+# row hashes of a strided sample (plus the first and last rows). Changes that
+# touch no sampled row and keep the shape are not detected.
+def frame_fingerprint(df: pd.DataFrame, sample_rows=FINGERPRINT_SAMPLE_ROWS) -> str:
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(repr([(str(col), str(dtype)) for col, dtype in df.dtypes.items()]).encode())
+    digest.update(repr(df.shape).encode())
+    if len(df):
+        positions = np.unique(np.linspace(0, len(df) - 1, min(sample_rows, len(df))).astype(np.int64))
+        row_hashes = pd.util.hash_pandas_object(df.iloc[positions], index=False)
+        digest.update(row_hashes.to_numpy().tobytes())
+    return digest.hexdigest()
+
+def build_table_fingerprint_query(source_type: str, table_name: str):
+    parts = table_name.strip().split(".", 1)
+    schema, table = (parts[0], parts[1]) if len(parts) == 2 else (None, parts[0])
+    if source_type == "teradata":
+        # LastAlterTimeStamp only moves on DDL; permanent space (and the row
+        # count of the latest statistics) change with data loads. Both are read
+        # from the data dictionary, never by scanning the table.
+        schema_filter = "t.DatabaseName = ?" if schema else "t.DatabaseName = DATABASE"
+        query = f"""
+            SELECT t.LastAlterTimeStamp,
+                   (SELECT SUM(z.CurrentPerm) FROM DBC.TableSizeV z
+                    WHERE z.DatabaseName = t.DatabaseName AND z.TableName = t.TableName),
+                   (SELECT MAX(s.RowCount) FROM DBC.TableStatsV s
+                    WHERE s.DatabaseName = t.DatabaseName AND s.TableName = t.TableName)
+            FROM DBC.TablesV t
+            WHERE {schema_filter} AND t.TableName = ?
+        """
+    else:
+        schema_filter = "s.name = ?" if schema else "s.name = SCHEMA_NAME()"
+        query = f"""
+            SELECT t.modify_date,
+                   (SELECT SUM(p.row_count) FROM sys.dm_db_partition_stats p
+                    WHERE p.object_id = t.object_id AND p.index_id IN (0, 1)),
+                   (SELECT MAX(u.last_user_update) FROM sys.dm_db_index_usage_stats u
+                    WHERE u.database_id = DB_ID() AND u.object_id = t.object_id)
+            FROM sys.tables t JOIN sys.schemas s ON s.schema_id = t.schema_id
+            WHERE {schema_filter} AND t.name = ?
+        """
+    params = [schema, table] if schema else [table]
+    return query, params
+
+# Identity of a database table from its catalog: last-alter timestamp plus
+# permanent space and statistics row count on Teradata, row count and last DML
+# time on Azure SQL. Cached for TABLE_FINGERPRINT_TTL seconds; refresh=True
+# reads the catalog again. None when it cannot be read.
+def table_fingerprint(source_type: str, conn_name: str, table_name: str, refresh=False):
+    try:
+        key = (get_saved_connection_key(source_type, conn_name), table_name)
+    except Exception:
+        return None
+    if refresh:
+        _table_fingerprints.invalidate(key)
+    fingerprint = _table_fingerprints.get(key)
+    if fingerprint is None:
+        fingerprint = read_table_fingerprint(source_type, conn_name, table_name)
+        if fingerprint is not None:
+            _table_fingerprints.put(key, fingerprint)
+    return fingerprint
+
+def read_table_fingerprint(source_type: str, conn_name: str, table_name: str):
+    query, params = build_table_fingerprint_query(source_type, table_name)
+    try:
+        with pooled_connection(source_type, conn_name) as con:
+            if con is None:
+                return None
+            cursor = con.cursor()
+            cursor.execute(query, params)
+            row = cursor.fetchone()
+            cursor.close()
+    except Exception:
+        return None
+    if row is None:
+        return None
+    return hashlib.blake2b(repr(tuple(row)).encode(), digest_size=16).hexdigest()
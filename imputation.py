@@ -0,0 +1,93 @@
+import numpy as np
+import pandas as pd
+from column_profiling import profile_numeric_columns
+
+IMPUTATION_STRATEGIES = ["mean", "median", "mode", "constant"]
+# Medians are exact up to this many rows, from the quantile sketch otherwise
+EXACT_MEDIAN_MAX_ROWS = 1_000_000
+
+# Most frequent value per group (smallest on ties, as SimpleImputer), as a
+# Series aligned to the rows of `series`. groups: integer group code per row.
+def _group_modes(series: pd.Series, groups: np.ndarray) -> pd.Series:
+    valid = series.notna().to_numpy()
+    pairs = pd.DataFrame({"group": groups[valid], "value": series[valid].to_numpy()})
+    counts = pairs.groupby(["group", "value"], sort=False).size().reset_index(name="rows")
+    best = counts.sort_values(["rows", "value"], ascending=[False, True], kind="stable").drop_duplicates("group")
+    modes = pd.Series(best["value"].to_numpy(), index=best["group"].to_numpy())
+    return pd.Series(modes.reindex(groups).to_numpy(), index=series.index)
+
+def column_mode(series: pd.Series):
+    modes = _group_modes(series, np.zeros(len(series), dtype=np.int64))
+    return modes.iloc[0] if len(modes) else np.nan
+
+# One fill value per column. Mean and median come from one column-parallel
+# profiling scan (profile_numeric_columns) over the columns that need them.
+def fill_values(df: pd.DataFrame, columns, strategy="mean", fill_value=None, exact=None) -> pd.Series:
+    columns = list(columns)
+    if strategy == "constant":
+        return pd.Series(0 if fill_value is None else fill_value, index=columns, dtype=object)
+    if strategy == "mode":
+        return pd.Series({col: column_mode(df[col]) for col in columns}, index=columns, dtype=object)
+    if strategy not in ("mean", "median"):
+        raise ValueError(f"Unknown imputation strategy: {strategy}")
+    if exact is None:
+        exact = len(df) <= EXACT_MEDIAN_MAX_ROWS
+    moments, sketches = profile_numeric_columns(df, columns, exact=exact and strategy == "median")
+    if strategy == "mean":
+        return pd.Series(np.where(moments.count > 0, moments.mean, np.nan), index=columns)
+    return sketches.quantiles([0.5]).loc[0.5, columns]
+
+# Per-row fill values from vectorized groupby transforms; groups with no
+# observed value are left NaN (and fall back to the column-wide value)
+def group_fill_values(series: pd.Series, keys, strategy="mean") -> pd.Series:
+    grouped = series.groupby(keys, dropna=False, observed=True, sort=False)
+    if strategy == "mode":
+        return _group_modes(series, grouped.ngroup().to_numpy())
+    return grouped.transform(strategy)
+
+# Whether every fill value is representable in dtype, so filling keeps it
+def _fits(dtype, values) -> bool:
+    if pd.api.types.is_float_dtype(dtype):
+        return True
+    if pd.api.types.is_integer_dtype(dtype):
+        values = pd.to_numeric(pd.Series(values), errors="coerce").to_numpy(dtype=np.float64, na_value=np.nan)
+        info = np.iinfo(dtype.numpy_dtype if hasattr(dtype, "numpy_dtype") else dtype)
+        return bool(np.all(np.isfinite(values) & (values == np.round(values)) & (values >= info.min) & (values <= info.max)))
+    return True
+
+# Fill missing values column by column. Only columns that have missing values
+# are replaced, each by one filled copy; the rest of the frame is not copied.
+# Columns keep their dtype when every fill value fits it; otherwise integer
+# columns widen to floats (nullable Float64 for nullable integers). With
+# group_by, mean/median/mode are computed within groups of those columns and
+# groups with no observed value use the column-wide value. Returns the frame
+# and a per-column report of missing counts, fill values and dtypes.
+def impute_missing(df: pd.DataFrame, columns=None, strategy="mean", fill_value=None, group_by=None, exact=None):
+    columns = list(df.select_dtypes(include="number").columns if columns is None else columns)
+    missing = df[columns].isna().sum() if columns else pd.Series(dtype=np.int64)
+    targets = missing.index[missing > 0].tolist()
+    values = fill_values(df, targets, strategy, fill_value, exact)
+    # Group keys are taken before any column is filled
+    keys = [df[col] for col in group_by or []]
+    report = pd.DataFrame({
+        "missing": missing[targets],
+        "fill_value": values,
+        "dtype_before": df[targets].dtypes.astype(str),
+    }, index=targets)
+    for col in targets:
+        series = df[col]
+        rows = series.isna().to_numpy()
+        if keys and strategy != "constant":
+            fills = group_fill_values(series, keys, strategy).fillna(values[col]).to_numpy()[rows]
+        else:
+            fills = np.full(rows.sum(), values[col], dtype=object)
+        # All-missing columns have no mean/median/mode and are left as they are
+        if pd.isna(fills).any():
+            continue
+        if not _fits(series.dtype, fills):
+            series = series.astype("Float64" if isinstance(series.dtype, pd.api.extensions.ExtensionDtype) else np.float64)
+        filled = series.copy()
+        filled[rows] = pd.array(fills, dtype=series.dtype)
+        df[col] = filled
+    report["dtype_after"] = df[targets].dtypes.astype(str)
+    return df, report
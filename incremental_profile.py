@@ -0,0 +1,265 @@
+import datetime
+import json
+import os
+import re
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+from connector import get_saved_connection_key
+from result_cache import LRUCache
+from data_fetch import iter_query_batches, fetch_table_columns, arrow_to_frame
+from sql_builder import build_select, quote_identifier
+from fingerprint import table_fingerprint
+from profile_stats import MomentAccumulator, PROFILE_COLUMNS, is_numeric_type
+from sketches import ColumnQuantileSketches, HyperLogLog, TopKCounter, hash_values
+from column_profiling import profile_numeric_columns
+
+# Persisted profile states, one JSON file per source, connection and table
+PROFILE_STATE_DIR = "profile_state"
+# Most frequent values listed per column
+TOP_VALUES = 5
+# Streamed profiles kept across reruns
+STREAMED_PROFILE_TTL = 15 * 60  # seconds
+STREAMED_PROFILE_MAX_ENTRIES = 64
+
+_streamed_profiles = LRUCache(ttl=STREAMED_PROFILE_TTL, max_entries=STREAMED_PROFILE_MAX_ENTRIES)
+
+# Watermarks are stored with their type so they come back as query parameters
+# of the same type (datetime, date or number), not as strings
+def encode_watermark(value):
+    if value is None:
+        return None
+    if isinstance(value, pd.Timestamp):
+        value = value.to_pydatetime()
+    if isinstance(value, datetime.datetime):
+        return {"type": "datetime", "value": value.isoformat()}
+    if isinstance(value, datetime.date):
+        return {"type": "date", "value": value.isoformat()}
+    if isinstance(value, (np.integer, int)):
+        return {"type": "int", "value": int(value)}
+    if isinstance(value, (np.floating, float)):
+        return {"type": "float", "value": float(value)}
+    return {"type": "str", "value": str(value)}
+
+def decode_watermark(state):
+    if state is None:
+        return None
+    kind, value = state["type"], state["value"]
+    if kind == "datetime":
+        return datetime.datetime.fromisoformat(value)
+    if kind == "date":
+        return datetime.date.fromisoformat(value)
+    return {"int": int, "float": float, "str": str}[kind](value)
+
+# Values as hashed and counted by the distinct and top-k sketches. Numbers are
+# float64 and everything else is text, so a column hashes the same whether a
+# batch arrived as int64, float64 (int64 with nulls) or objects.
+def sketch_values(series: pd.Series, numeric: bool) -> np.ndarray:
+    if numeric:
+        values = pd.to_numeric(series, errors="coerce").to_numpy(dtype=np.float64, na_value=np.nan)
+        return values[~np.isnan(values)]
+    return series.dropna().astype(str).to_numpy(dtype=object)
+
+class ProfileState:
+    # Mergeable profile of a table: null counts, moments and quantile sketches
+    # of numeric columns, and HyperLogLog distinct counts and top-k values of
+    # every column, plus the highest watermark value seen. Folding new rows in
+    # with update() gives the same state as profiling all rows at once (exact
+    # for counts and moments, within sketch error for the rest).
+    def __init__(self, columns, numeric_columns, watermark_column=None):
+        self.columns = list(columns)
+        self.numeric_columns = [col for col in self.columns if col in set(numeric_columns)]
+        self.watermark_column = watermark_column
+        self.watermark = None
+        self.rows = 0
+        self.nulls = pd.Series(0, index=self.columns, dtype=np.int64)
+        self.moments = MomentAccumulator(self.numeric_columns)
+        self.sketches = ColumnQuantileSketches(self.numeric_columns)
+        self.distinct = {col: HyperLogLog() for col in self.columns}
+        self.top = {col: TopKCounter() for col in self.columns}
+
+    def update(self, df: pd.DataFrame):
+        if not len(df):
+            return self
+        moments, sketches = profile_numeric_columns(df, self.numeric_columns)
+        self.moments.merge(moments)
+        self.sketches.merge(sketches)
+        self.nulls += df[self.columns].isna().sum().to_numpy()
+        numeric = set(self.numeric_columns)
+        for col in self.columns:
+            values = sketch_values(df[col], col in numeric)
+            if len(values):
+                self.distinct[col].update_hashes(hash_values(values))
+                self.top[col].update(values)
+        self.rows += len(df)
+        if self.watermark_column is not None:
+            newest = df[self.watermark_column].max()
+            if pd.notna(newest):
+                newest = decode_watermark(encode_watermark(newest))
+                if self.watermark is None or newest > self.watermark:
+                    self.watermark = newest
+        return self
+
+    # Per-column profile in the shape of the in-database profile, with
+    # quartiles and the most frequent values added
+    def profile(self, top_values=TOP_VALUES) -> pd.DataFrame:
+        stats = pd.DataFrame(index=self.columns, columns=PROFILE_COLUMNS, dtype=np.float64)
+        stats["count"] = self.rows - self.nulls
+        stats["nulls"] = self.nulls
+        stats["distinct"] = [round(self.distinct[col].estimate()) for col in self.columns]
+        if self.numeric_columns:
+            numeric = self.moments.profile()
+            for stat in ("mean", "std", "min", "max", "skewness", "kurtosis"):
+                stats.loc[self.numeric_columns, stat] = numeric[stat].to_numpy()
+            quartiles = self.sketches.quantiles([0.25, 0.5, 0.75])
+            for q in quartiles.index:
+                stats.loc[self.numeric_columns, f"{q:.0%}"] = quartiles.loc[q].to_numpy()
+        stats["top_values"] = [
+            ", ".join(f"{value} ({count:,})" for value, count in self.top[col].top(top_values))
+            for col in self.columns
+        ]
+        return stats
+
+    def to_state(self) -> dict:
+        return {
+            "columns": self.columns,
+            "numeric_columns": self.numeric_columns,
+            "watermark_column": self.watermark_column,
+            "watermark": encode_watermark(self.watermark),
+            "rows": self.rows,
+            "nulls": self.nulls.tolist(),
+            "moments": self.moments.to_state(),
+            "sketches": self.sketches.to_state(),
+            "distinct": {col: hll.to_state() for col, hll in self.distinct.items()},
+            "top": {col: counter.to_state() for col, counter in self.top.items()},
+        }
+
+    @classmethod
+    def from_state(cls, state: dict):
+        profile = cls(state["columns"], state["numeric_columns"], state["watermark_column"])
+        profile.watermark = decode_watermark(state["watermark"])
+        profile.rows = state["rows"]
+        profile.nulls = pd.Series(state["nulls"], index=profile.columns, dtype=np.int64)
+        profile.moments = MomentAccumulator.from_state(state["moments"])
+        profile.sketches = ColumnQuantileSketches.from_state(state["sketches"])
+        profile.distinct = {col: HyperLogLog.from_state(hll) for col, hll in state["distinct"].items()}
+        profile.top = {col: TopKCounter.from_state(counter) for col, counter in state["top"].items()}
+        return profile
+
+    # Written to a temporary file first, so a failed save keeps the old state
+    def save(self, path: str):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(f"{path}.tmp", "w") as f:
+            json.dump(self.to_state(), f)
+        os.replace(f"{path}.tmp", path)
+
+    @classmethod
+    def load(cls, path: str):
+        if not os.path.exists(path):
+            return None
+        with open(path) as f:
+            return cls.from_state(json.load(f))
+
+def profile_state_path(source_type: str, conn_name: str, table_name: str, state_dir=PROFILE_STATE_DIR) -> str:
+    name = re.sub(r"[^\w.-]", "_", f"{source_type}_{conn_name}_{table_name}")
+    return os.path.join(state_dir, f"{name}.json")
+
+# SELECT of the rows past the watermark (all rows before the first profile).
+# Rows whose watermark is NULL, or not greater than the stored value, are not
+# fetched again, so the column must only grow (a load timestamp or sequence ID).
+# Rows loaded later with the same value as the stored watermark (a tie, e.g. a
+# second load within one timestamp tick) are skipped too: re-reading with >=
+# would count the rows already merged twice, as the sketches cannot drop
+# duplicates. Use a column that is strictly increasing across loads.
+def incremental_query(source_type: str, table_name: str, columns, watermark_column: str, watermark=None):
+    query = build_select(table_name, source_type, columns=columns)
+    if watermark is None:
+        return query, None
+    return f"{query} WHERE {quote_identifier(source_type, watermark_column)} > ?", [watermark]
+
+# Fold Arrow record batches into the state, stopping after max_rows (None or
+# 0 = no limit); returns the number of new rows
+def merge_batches(state: ProfileState, batches, progress=None, max_rows=None) -> int:
+    new_rows = 0
+    for batch in batches:
+        if max_rows and new_rows + batch.num_rows > max_rows:
+            batch = batch.slice(0, max_rows - new_rows)
+        state.update(arrow_to_frame(pa.Table.from_batches([batch])))
+        new_rows += batch.num_rows
+        if progress is not None:
+            progress.text(f"Merged {new_rows:,} new rows...")
+        if max_rows and new_rows >= max_rows:
+            break
+    return new_rows
+
+# Empty state over the catalog columns (ColumnName / DataType, as
+# fetch_table_columns), limited to `columns` when given
+def new_profile_state(source_type: str, columns_df: pd.DataFrame, columns=None, watermark_column=None) -> ProfileState:
+    if columns:
+        columns_df = columns_df[columns_df["ColumnName"].isin(columns)]
+    names = columns_df["ColumnName"].tolist()
+    if watermark_column is not None and watermark_column not in names:
+        names.append(watermark_column)
+    numeric = [name for name, data_type in zip(columns_df["ColumnName"], columns_df["DataType"])
+               if is_numeric_type(source_type, data_type)]
+    return ProfileState(names, numeric, watermark_column)
+
+# Raise when a stored state was built for another watermark column or another
+# set of columns than requested (`columns`, or every catalog column when empty)
+def check_stored_state(state: ProfileState, state_path: str, source_type: str, watermark_column: str,
+                       load_columns, columns=None):
+    if state.watermark_column != watermark_column:
+        raise ValueError(f"The stored profile uses watermark column {state.watermark_column}; "
+                         f"delete {state_path} to start over with {watermark_column}")
+    requested = new_profile_state(source_type, load_columns(), columns, watermark_column).columns
+    if set(requested) != set(state.columns):
+        raise ValueError(f"The stored profile covers columns {', '.join(state.columns)}; "
+                         f"delete {state_path} to start over with {', '.join(requested)}")
+
+# Stored state at state_path, or a new one over the catalog columns that
+# load_columns() returns (ColumnName / DataType, as fetch_table_columns)
+def load_or_create_state(state_path: str, source_type: str, watermark_column: str, load_columns, columns=None) -> ProfileState:
+    state = ProfileState.load(state_path)
+    if state is not None:
+        check_stored_state(state, state_path, source_type, watermark_column, load_columns, columns)
+        return state
+    return new_profile_state(source_type, load_columns(), columns, watermark_column)
+
+# Profile of a table streamed batch by batch into a fresh state, so memory
+# holds one fetch batch and the sketches, never the rows. Cached per
+# connection, projection, sample, row limit and table fingerprint.
+def stream_profile(source_type: str, conn_name: str, table_name: str, columns=None, sample=None,
+                   max_rows=None, refresh=False, progress=None) -> pd.DataFrame:
+    key = (get_saved_connection_key(source_type, conn_name), table_name, tuple(columns or ()), sample, max_rows or None,
+           table_fingerprint(source_type, conn_name, table_name, refresh))
+    if refresh:
+        _streamed_profiles.invalidate(key)
+
+    def compute():
+        state = new_profile_state(source_type, fetch_table_columns(source_type, conn_name, table_name), columns)
+        query = build_select(table_name, source_type, columns=state.columns, limit=max_rows, sample=sample)
+        batches = iter_query_batches(source_type, conn_name, query, as_arrow=True)
+        try:
+            merge_batches(state, batches, progress, max_rows)
+        finally:
+            batches.close()
+        return state.profile()
+    return _streamed_profiles.get_or_compute(key, compute)
+
+# Profile state of a table from a saved connection, created on first use and
+# afterwards extended with only the rows past the stored watermark. The state
+# is saved only after every new row was merged, so a failed fetch is retried
+# from the same watermark. Returns (state, new rows).
+def refresh_profile(source_type: str, conn_name: str, table_name: str, watermark_column: str,
+                    columns=None, state_path=None, progress=None):
+    state_path = state_path or profile_state_path(source_type, conn_name, table_name)
+    state = load_or_create_state(state_path, source_type, watermark_column,
+                                 lambda: fetch_table_columns(source_type, conn_name, table_name), columns)
+    query, params = incremental_query(source_type, table_name, state.columns, watermark_column, state.watermark)
+    batches = iter_query_batches(source_type, conn_name, query, as_arrow=True, params=params)
+    try:
+        new_rows = merge_batches(state, batches, progress)
+    finally:
+        batches.close()
+    state.save(state_path)
+    return state, new_rows
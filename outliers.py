@@ -0,0 +1,112 @@
+import numpy as np
+import pandas as pd
+from profile_stats import MomentAccumulator, iter_value_blocks
+from sketches import ColumnQuantileSketches
+
+OUTLIER_METHODS = ["zscore", "iqr", "mad"]
+Z_THRESHOLD = 3.0
+IQR_FACTOR = 1.5
+# Modified z-score 0.6745 * (x - median) / MAD above 3.5 (Iglewicz & Hoaglin)
+MAD_THRESHOLD = 3.5
+MAD_SCALE = 0.6745
+# With MAD = 0 (over half the values equal the median) the modified z-score
+# uses (x - median) / (1.253314 * mean absolute deviation) instead
+MEANAD_SCALE = 1.253314
+
+# Every method reduces to a per-column [low, high] interval, so one comparison
+# pass counts all of them. Returns {method: DataFrame(low, high) by column}.
+def outlier_bounds(moments: MomentAccumulator, sketches: ColumnQuantileSketches,
+                   z_threshold=Z_THRESHOLD, iqr_factor=IQR_FACTOR, mad_threshold=MAD_THRESHOLD) -> dict:
+    columns = moments.columns
+    quartiles = sketches.quantiles([0.25, 0.5, 0.75])
+    q1, median, q3 = (quartiles.loc[q, columns].to_numpy(dtype=np.float64) for q in (0.25, 0.5, 0.75))
+    # Population std, as scipy.stats.zscore
+    z_spread = z_threshold * moments.std(ddof=0)
+    iqr_spread = iqr_factor * (q3 - q1)
+    mad = sketches.median_absolute_deviation()[columns].to_numpy()
+    mean_ad = sketches.mean_absolute_deviation()[columns].to_numpy()
+    mad_spread = mad_threshold * np.where(mad > 0, mad / MAD_SCALE, MEANAD_SCALE * mean_ad)
+    return {
+        "zscore": pd.DataFrame({"low": moments.mean - z_spread, "high": moments.mean + z_spread}, index=columns),
+        "iqr": pd.DataFrame({"low": q1 - iqr_spread, "high": q3 + iqr_spread}, index=columns),
+        "mad": pd.DataFrame({"low": median - mad_spread, "high": median + mad_spread}, index=columns),
+    }
+
+class OutlierCounter:
+    # Counts values outside the bounds of each method, block by block and
+    # without copying rows. NaN compares false and is never an outlier. With
+    # sample_limit > 0 the first offending row labels (positions for raw
+    # blocks) are kept per method and column, up to the limit. Counters over
+    # separate chunks of the same columns combine with merge().
+    def __init__(self, bounds: dict, sample_limit=0):
+        self.bounds = bounds
+        self.columns = list(next(iter(bounds.values())).index)
+        self.sample_limit = sample_limit
+        self.rows = 0
+        self.counts = {method: np.zeros(len(self.columns), dtype=np.int64) for method in bounds}
+        self.samples = {method: [[] for _ in self.columns] for method in bounds}
+
+    def update(self, df: pd.DataFrame):
+        labels = df.index.to_numpy()
+        start = 0
+        for values in iter_value_blocks(df, self.columns):
+            self.update_values(values, labels[start:start + len(values)])
+            start += len(values)
+        return self
+
+    # labels: row labels of the block; defaults to running row positions
+    def update_values(self, values: np.ndarray, labels=None):
+        if labels is None:
+            labels = np.arange(self.rows, self.rows + len(values))
+        for method, limits in self.bounds.items():
+            with np.errstate(invalid="ignore"):
+                flags = (values < limits["low"].to_numpy()) | (values > limits["high"].to_numpy())
+            self.counts[method] += flags.sum(axis=0)
+            if self.sample_limit:
+                self._keep_samples(method, flags, labels)
+        self.rows += len(values)
+        return self
+
+    def _keep_samples(self, method, flags, labels):
+        for i, kept in enumerate(self.samples[method]):
+            room = self.sample_limit - sum(len(part) for part in kept)
+            if room > 0:
+                hits = np.flatnonzero(flags[:, i])[:room]
+                if len(hits):
+                    kept.append(labels[hits])
+
+    def merge(self, other):
+        for method in self.counts:
+            self.counts[method] += other.counts[method]
+            if self.sample_limit:
+                for kept, extra in zip(self.samples[method], other.samples[method]):
+                    for part in extra:
+                        room = self.sample_limit - sum(len(k) for k in kept)
+                        if room <= 0:
+                            break
+                        kept.append(part[:room])
+        self.rows += other.rows
+        return self
+
+    # Side-by-side union of counters over disjoint columns of the same rows
+    @classmethod
+    def concat(cls, parts):
+        bounds = {method: pd.concat([part.bounds[method] for part in parts]) for method in parts[0].bounds}
+        combined = cls(bounds, parts[0].sample_limit)
+        combined.rows = parts[0].rows
+        for method in bounds:
+            combined.counts[method] = np.concatenate([part.counts[method] for part in parts])
+            combined.samples[method] = [kept for part in parts for kept in part.samples[method]]
+        return combined
+
+    # Outlier counts, one row per column and one column per method
+    def to_frame(self) -> pd.DataFrame:
+        return pd.DataFrame(self.counts, index=self.columns)
+
+    def sample_indices(self, method: str, column) -> np.ndarray:
+        kept = self.samples[method][self.columns.index(column)]
+        return np.concatenate(kept)[:self.sample_limit] if kept else np.empty(0)
+
+# Counts for all methods in one pass over df
+def count_outliers(df: pd.DataFrame, bounds: dict, sample_limit=0) -> OutlierCounter:
+    return OutlierCounter(bounds, sample_limit).update(df)
@@ -0,0 +1,74 @@
+import hashlib
+import pandas as pd
+from result_cache import LRUCache
+from data_fetch import frame_nbytes
+from fingerprint import frame_fingerprint
+from duplicates import drop_duplicate_rows
+from imputation import impute_missing
+from type_detection import plan_conversions, apply_conversions, DETECTION_SAMPLE_ROWS, CATEGORY_MAX_UNIQUE
+from column_profiling import profile_distinct_columns
+
+# Stage outputs kept across reruns, bounded by total frame size
+PIPELINE_CACHE_MAX_BYTES = 2 * 1024 ** 3
+# Results derived from a stage output (statistics, sketches) kept by count
+DERIVED_CACHE_MAX_ENTRIES = 64
+
+_stage_cache = LRUCache(max_bytes=PIPELINE_CACHE_MAX_BYTES, sizeof=lambda entry: frame_nbytes(entry[0]))
+_derived_cache = LRUCache(max_entries=DERIVED_CACHE_MAX_ENTRIES)
+
+# A stage is (name, func, config): func(df, **config) returns (frame, info).
+# It receives a shallow copy of its input and must replace columns rather than
+# write into their arrays, because the input may be a cached stage output.
+def stage_key(input_key: str, name: str, config: dict) -> str:
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(repr((input_key, name, sorted(config.items()))).encode())
+    return digest.hexdigest()
+
+# Run the stages in order. Each output is cached under a key chained from the
+# input fingerprint and the configuration of every stage up to it, so when only
+# a later stage changes the unchanged prefix is served from the cache. Returns
+# (frame, {stage name: info}, key of the final output); treat the frame as read-only.
+def run_pipeline(df: pd.DataFrame, stages, input_key=None):
+    key = input_key or frame_fingerprint(df)
+    infos = {}
+    for name, func, config in stages:
+        key = stage_key(key, name, config)
+        entry = _stage_cache.get(key)
+        if entry is None:
+            entry = func(df.copy(deep=False), **config)
+            _stage_cache.put(key, entry)
+        df, infos[name] = entry
+    return df, infos, key
+
+# Cache a value computed from a pipeline output under its key
+def memoize(key, compute):
+    return _derived_cache.get_or_compute(key, compute)
+
+# One scan counts the distinct values of every column: exactly up to the
+# category limit, which decides category conversions, and as a HyperLogLog
+# estimate beyond it, which the key analysis uses
+def conversion_stage(df: pd.DataFrame, source=None, sample_rows=DETECTION_SAMPLE_ROWS):
+    distinct = profile_distinct_columns(df, df.columns, CATEGORY_MAX_UNIQUE)
+    summary = apply_conversions(df, plan_conversions(df, sample_rows, source=source, distinct=distinct))
+    return df, {"summary": summary, "distinct": distinct}
+
+# Fill values come from the profiling accumulators and only columns with
+# missing values are replaced, keeping their dtype where the values fit
+def imputation_stage(df: pd.DataFrame, strategy="mean", fill_value=None, group_by=()):
+    # Any numeric width, since loads may be downcast to int8..float32
+    numeric_columns = df.select_dtypes(include='number').columns.tolist()
+    df, report = impute_missing(df, numeric_columns, strategy, fill_value, list(group_by))
+    return df, {"columns": numeric_columns, "report": report}
+
+def deduplication_stage(df: pd.DataFrame):
+    before = len(df)
+    df = drop_duplicate_rows(df)
+    return df, before - len(df)
+
+# Cleaning stages of the profiling page
+def profiling_stages(source=None, imputation="mean", fill_value=None, impute_by=()) -> list:
+    return [
+        ("conversions", conversion_stage, {"source": source}),
+        ("imputation", imputation_stage, {"strategy": imputation, "fill_value": fill_value, "group_by": tuple(impute_by)}),
+        ("deduplication", deduplication_stage, {}),
+    ]
@@ -0,0 +1,130 @@
+import io
+import os
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import pandas as pd
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.colors import LogNorm
+from profile_stats import MomentAccumulator, iter_value_blocks
+from result_cache import LRUCache
+
+# Pairs with more points than this are drawn as 2D-binned density plots
+SCATTER_MAX_POINTS = 5_000
+PAIR_PLOT_BINS = 100
+
+# Rendered PNGs are kept across reruns, bounded by total size
+FIGURE_CACHE_MAX_BYTES = 256 * 1024 ** 2
+RENDER_DPI = 100
+RENDER_WORKERS = min(8, os.cpu_count() or 1)
+
+_figure_cache = LRUCache(max_bytes=FIGURE_CACHE_MAX_BYTES, sizeof=len)
+# Figures are built with the object-oriented API (no pyplot global state), so
+# separate figures can be drawn and rasterized on worker threads.
+_render_pool = ThreadPoolExecutor(max_workers=RENDER_WORKERS, thread_name_prefix="plot-render")
+
+# Rasterize a figure to PNG bytes and release it
+def render_png(fig: Figure, dpi=RENDER_DPI) -> bytes:
+    try:
+        FigureCanvasAgg(fig)
+        buffer = io.BytesIO()
+        fig.savefig(buffer, format="png", dpi=dpi)
+        return buffer.getvalue()
+    finally:
+        fig.clear()
+
+def render_cached(key, draw) -> bytes:
+    return _figure_cache.get_or_compute(key, lambda: render_png(draw()))
+
+# Render [(key, draw), ...] where draw() returns a Figure; cache misses are
+# drawn in parallel on the worker pool. Returns PNG bytes in input order.
+def render_many(jobs) -> list:
+    results = [_figure_cache.get(key) for key, _ in jobs]
+    pending = {
+        i: _render_pool.submit(render_png_from, draw)
+        for i, (_, draw) in enumerate(jobs) if results[i] is None
+    }
+    for i, future in pending.items():
+        results[i] = future.result()
+        _figure_cache.put(jobs[i][0], results[i])
+    return results
+
+def render_png_from(draw) -> bytes:
+    return render_png(draw())
+
+# Pairs with fewer rows where both columns are present get a NaN correlation
+CORR_MIN_PERIODS = 2
+
+# Pearson correlation of all numeric columns from one block-wise pass, over
+# pairwise-complete observations like DataFrame.corr. Values are shifted by
+# the column means first to keep the running sums well conditioned.
+def correlation_matrix(df: pd.DataFrame, columns, moments: MomentAccumulator = None,
+                       min_periods=CORR_MIN_PERIODS) -> pd.DataFrame:
+    columns = list(columns)
+    if moments is None:
+        moments = MomentAccumulator(columns).update(df)
+    mean = np.where(moments.count > 0, moments.mean, 0.0)
+    k = len(columns)
+    n, sx, sxx, sxy = (np.zeros((k, k)) for _ in range(4))
+    for values in iter_value_blocks(df, columns):
+        present = np.isfinite(values).astype(np.float64)
+        shifted = np.where(present > 0, values - mean, 0.0)
+        n += present.T @ present
+        # sx[i, j]: sum of column i over the rows where j is also present
+        sx += shifted.T @ present
+        sxx += (shifted * shifted).T @ present
+        sxy += shifted.T @ shifted
+    with np.errstate(invalid="ignore", divide="ignore"):
+        cov = sxy - sx * sx.T / n
+        var_x = sxx - sx * sx / n
+        corr = cov / np.sqrt(var_x * var_x.T)
+    corr[n < max(min_periods, 2)] = np.nan
+    return pd.DataFrame(np.clip(corr, -1.0, 1.0), index=columns, columns=columns)
+
+# The k column pairs with the largest absolute correlation
+def top_correlated_pairs(corr: pd.DataFrame, k=10) -> list:
+    values = corr.to_numpy()
+    rows, cols = np.triu_indices(len(corr), k=1)
+    strength = np.nan_to_num(np.abs(values[rows, cols]), nan=-1.0)
+    order = np.argsort(-strength, kind="stable")[:k]
+    return [(corr.index[rows[i]], corr.columns[cols[i]], values[rows[i], cols[i]]) for i in order]
+
+def plot_histogram(counts, edges, column: str) -> Figure:
+    fig = Figure()
+    ax = fig.subplots()
+    ax.hist(edges[:-1], bins=edges, weights=counts, color='skyblue', edgecolor='black')
+    ax.set_title(f'Distribution of {column}')
+    return fig
+
+def plot_correlation_heatmap(corr: pd.DataFrame) -> Figure:
+    size = max(6, min(0.25 * len(corr), 24))
+    fig = Figure(figsize=(size, size * 0.85))
+    ax = fig.subplots()
+    image = ax.imshow(corr.to_numpy(), cmap="coolwarm", vmin=-1, vmax=1)
+    ax.set_xticks(range(len(corr)))
+    ax.set_yticks(range(len(corr)))
+    ax.set_xticklabels(corr.columns, rotation=90, fontsize=7)
+    ax.set_yticklabels(corr.index, fontsize=7)
+    ax.set_title("Correlation Matrix")
+    fig.colorbar(image, ax=ax, fraction=0.046, pad=0.04)
+    fig.tight_layout()
+    return fig
+
+# Scatter for small pairs; otherwise a 2D histogram, so drawing cost depends
+# on the bin count rather than the number of points
+def plot_pair(df: pd.DataFrame, x: str, y: str, max_points=SCATTER_MAX_POINTS, bins=PAIR_PLOT_BINS) -> Figure:
+    values = df[[x, y]].to_numpy(dtype=np.float64, na_value=np.nan)
+    values = values[~np.isnan(values).any(axis=1)]
+    fig = Figure()
+    ax = fig.subplots()
+    if len(values) <= max_points:
+        ax.scatter(values[:, 0], values[:, 1], alpha=0.5)
+    else:
+        counts, x_edges, y_edges = np.histogram2d(values[:, 0], values[:, 1], bins=bins)
+        mesh = ax.pcolormesh(x_edges, y_edges, np.ma.masked_equal(counts.T, 0), cmap="viridis",
+                             norm=LogNorm())
+        fig.colorbar(mesh, ax=ax, label="points per bin")
+    ax.set_xlabel(x)
+    ax.set_ylabel(y)
+    ax.set_title(f'{x} vs {y}')
+    return fig
@@ -0,0 +1,257 @@
+import numpy as np
+import pandas as pd
+from sql_builder import build_select, quote_identifier
+
+# Catalog type codes (DBC.ColumnsV.ColumnType / INFORMATION_SCHEMA DATA_TYPE)
+NUMERIC_TYPES = {
+    "teradata": {"I1", "I2", "I", "I8", "D", "F", "N"},
+    "azuresql": {"tinyint", "smallint", "int", "bigint", "decimal", "numeric",
+                 "float", "real", "money", "smallmoney"},
+}
+# Types that cannot be compared, so COUNT(DISTINCT) is skipped for them
+LOB_TYPES = {
+    "teradata": {"CO", "BO", "JN", "XM", "UT", "A1", "AN"},
+    "azuresql": {"text", "ntext", "image", "xml", "geography", "geometry", "hierarchyid", "sql_variant"},
+}
+
+PROFILE_COLUMNS = ["count", "nulls", "distinct", "mean", "std", "min", "max", "skewness", "kurtosis"]
+
+def is_numeric_type(source_type: str, data_type) -> bool:
+    return str(data_type).strip() in NUMERIC_TYPES.get(source_type, set())
+
+# Teradata applies SAMPLE to the final result set and rejects it inside derived
+# tables, so only hash samples (a WHERE filter) can be aggregated there.
+def supports_profile_pushdown(source_type: str, sample=None) -> bool:
+    return not (source_type == "teradata" and sample and sample[0] != "hash")
+
+# Compile one aggregate statement covering every column of the table. Numeric
+# columns are cast to FLOAT, and their power sums are taken about the column
+# mean (from a one-row derived table of AVGs, cross-joined) so they keep their
+# precision when the mean is large next to the spread. Counts are 64-bit so
+# multi-billion-row tables do not overflow.
+def build_profile_query(source_type: str, table_name: str, columns_df: pd.DataFrame, sample=None) -> str:
+    if source_type == "teradata":
+        stddev = "STDDEV_SAMP"
+        count = lambda expr: f"CAST(COUNT({expr}) AS BIGINT)"
+    else:
+        stddev = "STDEV"
+        count = lambda expr: f"COUNT_BIG({expr})"
+    select_items = [f"{count('*')} AS row_count"]
+    mean_items = []
+    for i, (name, data_type) in enumerate(zip(columns_df["ColumnName"], columns_df["DataType"])):
+        col = quote_identifier(source_type, name)
+        data_type = str(data_type).strip()
+        select_items.append(f"{count(col)} AS c{i}_n")
+        if data_type not in LOB_TYPES.get(source_type, set()):
+            select_items.append(f"{count('DISTINCT ' + col)} AS c{i}_nd")
+        if is_numeric_type(source_type, data_type):
+            x = f"CAST({col} AS FLOAT)"
+            d = f"({x} - m.c{i}_mu)"
+            mean_items.append(f"AVG({x}) AS c{i}_mu")
+            select_items += [
+                f"MIN({x}) AS c{i}_min",
+                f"MAX({x}) AS c{i}_max",
+                f"AVG({x}) AS c{i}_avg",
+                f"{stddev}({x}) AS c{i}_std",
+                f"SUM({d}) AS c{i}_s1",
+                f"SUM(POWER({d}, 2)) AS c{i}_s2",
+                f"SUM(POWER({d}, 3)) AS c{i}_s3",
+                f"SUM(POWER({d}, 4)) AS c{i}_s4",
+            ]
+    rows = table_name
+    if sample:
+        rows = f"({build_select(table_name, source_type, columns=columns_df['ColumnName'].tolist(), sample=sample)})"
+    source = f"{rows} AS s" if sample else rows
+    if mean_items:
+        means_source = f"{rows} AS s0" if sample else rows
+        source += f" CROSS JOIN (SELECT {', '.join(mean_items)} FROM {means_source}) AS m"
+    return "SELECT\n    " + ",\n    ".join(select_items) + f"\nFROM {source}"
+
+# Population skewness and excess kurtosis (scipy.stats defaults) from the power
+# sums of (x - shift), shift being the column mean. A random sample is drawn
+# again for the mean, so the shift can be slightly off; s1 carries that offset.
+def moments_to_shape(n, s1, s2, s3, s4):
+    if not n:
+        return np.nan, np.nan
+    offset = s1 / n
+    m2 = s2 / n - offset ** 2
+    m3 = s3 / n - 3 * offset * s2 / n + 2 * offset ** 3
+    m4 = s4 / n - 4 * offset * s3 / n + 6 * offset ** 2 * s2 / n - 3 * offset ** 4
+    if m2 <= 0:
+        return np.nan, np.nan
+    return m3 / m2 ** 1.5, m4 / m2 ** 2 - 3
+
+# Turn the single aggregate row into a per-column profile table
+def profile_from_aggregates(aggregates: pd.Series, columns_df: pd.DataFrame) -> pd.DataFrame:
+    row_count = int(aggregates["row_count"])
+    records = {}
+    for i, name in enumerate(columns_df["ColumnName"]):
+        non_null = int(aggregates[f"c{i}_n"])
+        stats = dict.fromkeys(PROFILE_COLUMNS, np.nan)
+        stats["count"] = non_null
+        stats["nulls"] = row_count - non_null
+        stats["distinct"] = aggregates.get(f"c{i}_nd", np.nan)
+        if f"c{i}_s1" in aggregates and non_null:
+            sums = [float(aggregates[f"c{i}_s{k}"]) for k in range(1, 5)]
+            stats["mean"] = float(aggregates[f"c{i}_avg"])
+            stats["std"] = float(aggregates[f"c{i}_std"]) if pd.notna(aggregates[f"c{i}_std"]) else np.nan
+            stats["min"] = float(aggregates[f"c{i}_min"])
+            stats["max"] = float(aggregates[f"c{i}_max"])
+            stats["skewness"], stats["kurtosis"] = moments_to_shape(non_null, *sums)
+        records[name] = stats
+    return pd.DataFrame.from_dict(records, orient="index", columns=PROFILE_COLUMNS)
+
+# Rows processed per vectorized block; bounds the temporaries allocated by update()
+BLOCK_ROWS = 1 << 16
+
+# float64 row blocks of the given columns, copied one block at a time
+def iter_value_blocks(df: pd.DataFrame, columns, block_rows=BLOCK_ROWS):
+    positions = df.columns.get_indexer(columns)
+    for start in range(0, len(df), block_rows):
+        yield df.iloc[start:start + block_rows, positions].to_numpy(dtype=np.float64, na_value=np.nan)
+
+class MomentAccumulator:
+    # One-pass, mergeable per-column state for numeric columns: non-null count,
+    # mean, central moment sums M2..M4, min and max. Partial states built on
+    # separate chunks combine exactly with merge() (Chan / Pebay update rules).
+    def __init__(self, columns):
+        self.columns = list(columns)
+        k = len(self.columns)
+        self.rows = 0
+        self.count = np.zeros(k)
+        self.mean = np.zeros(k)
+        self.m2 = np.zeros(k)
+        self.m3 = np.zeros(k)
+        self.m4 = np.zeros(k)
+        self.min = np.full(k, np.inf)
+        self.max = np.full(k, -np.inf)
+
+    @classmethod
+    def from_values(cls, columns, values: np.ndarray):
+        acc = cls(columns)
+        acc.rows = values.shape[0]
+        mask = ~np.isnan(values)
+        n = mask.sum(axis=0).astype(np.float64)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean = np.where(n > 0, np.where(mask, values, 0.0).sum(axis=0) / n, 0.0)
+        d = np.where(mask, values - mean, 0.0)
+        d2 = d * d
+        acc.count = n
+        acc.mean = mean
+        acc.m2 = d2.sum(axis=0)
+        acc.m3 = (d2 * d).sum(axis=0)
+        acc.m4 = (d2 * d2).sum(axis=0)
+        acc.min = np.where(mask, values, np.inf).min(axis=0, initial=np.inf)
+        acc.max = np.where(mask, values, -np.inf).max(axis=0, initial=-np.inf)
+        return acc
+
+    def update(self, df: pd.DataFrame):
+        for values in iter_value_blocks(df, self.columns):
+            self.update_values(values)
+        return self
+
+    def update_values(self, values: np.ndarray):
+        return self.merge(MomentAccumulator.from_values(self.columns, values))
+
+    # Side-by-side union of accumulators over disjoint columns of the same rows
+    @classmethod
+    def concat(cls, parts):
+        acc = cls([col for part in parts for col in part.columns])
+        acc.rows = max((part.rows for part in parts), default=0)
+        for field in ("count", "mean", "m2", "m3", "m4", "min", "max"):
+            setattr(acc, field, np.concatenate([getattr(part, field) for part in parts]) if parts else getattr(acc, field))
+        return acc
+
+    def subset(self, columns):
+        positions = [self.columns.index(col) for col in columns]
+        acc = MomentAccumulator(columns)
+        acc.rows = self.rows
+        for field in ("count", "mean", "m2", "m3", "m4", "min", "max"):
+            setattr(acc, field, getattr(self, field)[positions])
+        return acc
+
+    def merge(self, other):
+        na, nb = self.count, other.count
+        n = na + nb
+        with np.errstate(invalid="ignore", divide="ignore"):
+            delta = other.mean - self.mean
+            nb_n = np.where(n > 0, nb / n, 0.0)
+            na_nb_n = np.where(n > 0, na * nb / n, 0.0)
+            mean = self.mean + delta * nb_n
+            m2 = self.m2 + other.m2 + delta ** 2 * na_nb_n
+            m3 = (self.m3 + other.m3
+                  + np.where(n > 0, delta ** 3 * na_nb_n * (na - nb) / n, 0.0)
+                  + np.where(n > 0, 3 * delta * (na * other.m2 - nb * self.m2) / n, 0.0))
+            m4 = (self.m4 + other.m4
+                  + np.where(n > 0, delta ** 4 * na_nb_n * (na * na - na * nb + nb * nb) / n ** 2, 0.0)
+                  + np.where(n > 0, 6 * delta ** 2 * (na * na * other.m2 + nb * nb * self.m2) / n ** 2, 0.0)
+                  + np.where(n > 0, 4 * delta * (na * other.m3 - nb * self.m3) / n, 0.0))
+        self.rows += other.rows
+        self.count, self.mean, self.m2, self.m3, self.m4 = n, mean, m2, m3, m4
+        self.min = np.minimum(self.min, other.min)
+        self.max = np.maximum(self.max, other.max)
+        return self
+
+    def to_state(self) -> dict:
+        state = {"columns": self.columns, "rows": self.rows}
+        for field in ("count", "mean", "m2", "m3", "m4", "min", "max"):
+            state[field] = getattr(self, field).tolist()
+        return state
+
+    @classmethod
+    def from_state(cls, state: dict):
+        acc = cls(state["columns"])
+        acc.rows = state["rows"]
+        for field in ("count", "mean", "m2", "m3", "m4", "min", "max"):
+            setattr(acc, field, np.asarray(state[field], dtype=np.float64))
+        return acc
+
+    def std(self, ddof=1) -> np.ndarray:
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return np.sqrt(np.where(self.count > ddof, self.m2 / (self.count - ddof), np.nan))
+
+    # Population skewness / excess kurtosis, matching scipy.stats defaults
+    def skewness(self) -> np.ndarray:
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return np.where(self.m2 > 0, np.sqrt(self.count) * self.m3 / self.m2 ** 1.5, np.nan)
+
+    def kurtosis(self) -> np.ndarray:
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return np.where(self.m2 > 0, self.count * self.m4 / self.m2 ** 2 - 3, np.nan)
+
+    def _bounds(self):
+        seen = self.count > 0
+        return np.where(seen, self.min, np.nan), np.where(seen, self.max, np.nan)
+
+    # describe()-shaped table; quantiles is an optional frame indexed by probability
+    def describe(self, quantiles: pd.DataFrame = None) -> pd.DataFrame:
+        col_min, col_max = self._bounds()
+        rows = {"count": self.count, "mean": np.where(self.count > 0, self.mean, np.nan), "std": self.std(), "min": col_min}
+        if quantiles is not None:
+            for q in quantiles.index:
+                rows[f"{q:.0%}"] = quantiles.loc[q, self.columns].to_numpy(dtype=np.float64)
+        rows["max"] = col_max
+        return pd.DataFrame(rows, index=self.columns).T
+
+    def profile(self) -> pd.DataFrame:
+        col_min, col_max = self._bounds()
+        stats = pd.DataFrame(index=self.columns, columns=PROFILE_COLUMNS, dtype=np.float64)
+        stats["count"] = self.count
+        stats["nulls"] = self.rows - self.count
+        stats["mean"] = np.where(self.count > 0, self.mean, np.nan)
+        stats["std"] = self.std()
+        stats["min"] = col_min
+        stats["max"] = col_max
+        stats["skewness"] = self.skewness()
+        stats["kurtosis"] = self.kurtosis()
+        return stats
+
+# |z| > threshold counts from accumulated mean and population std (as
+# scipy.stats.zscore), evaluated block-wise without building a z-score matrix
+def zscore_outlier_counts(df: pd.DataFrame, acc: MomentAccumulator, threshold=3.0) -> pd.Series:
+    counts = np.zeros(len(acc.columns), dtype=np.int64)
+    limit = threshold * acc.std(ddof=0)
+    for values in iter_value_blocks(df, acc.columns):
+        with np.errstate(invalid="ignore"):
+            counts += (np.abs(values - acc.mean) > limit).sum(axis=0)
+    return pd.Series(counts, index=acc.columns)
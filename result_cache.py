@@ -0,0 +1,82 @@
+import threading
+import time
+from collections import OrderedDict
+
+class LRUCache:
+    # Thread-safe LRU cache with an optional per-entry TTL (seconds), entry
+    # count limit and total size budget measured by sizeof(value).
+    def __init__(self, max_bytes=None, ttl=None, max_entries=None, sizeof=None):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._sizeof = sizeof or (lambda value: 0)
+        self._entries = OrderedDict()  # key -> (value, size, stored_at)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _expired(self, stored_at) -> bool:
+        return self.ttl is not None and time.monotonic() - stored_at > self.ttl
+
+    def _pop_locked(self, key):
+        _, size, _ = self._entries.pop(key)
+        self._bytes -= size
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or self._expired(entry[2]):
+                if entry is not None:
+                    self._pop_locked(key)
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, value):
+        size = self._sizeof(value)
+        with self._lock:
+            if key in self._entries:
+                self._pop_locked(key)
+            if self.max_bytes is not None and size > self.max_bytes:
+                return
+            self._entries[key] = (value, size, time.monotonic())
+            self._bytes += size
+            while self._entries and (
+                (self.max_bytes is not None and self._bytes > self.max_bytes)
+                or (self.max_entries is not None and len(self._entries) > self.max_entries)
+            ):
+                self._pop_locked(next(iter(self._entries)))
+
+    def get_or_compute(self, key, compute):
+        missing = object()
+        value = self.get(key, missing)
+        if value is missing:
+            value = compute()
+            self.put(key, value)
+        return value
+
+    def invalidate(self, key):
+        with self._lock:
+            if key in self._entries:
+                self._pop_locked(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def __contains__(self, key) -> bool:
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry is not None and not self._expired(entry[2])
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+    @property
+    def nbytes(self) -> int:
+        return self._bytes
@@ -2,7 +2,7 @@ import streamlit as st
 import pandas as pd
 import openpyxl
 import os
-from connector import get_teradata_connection, get_saved_connections
+from connector import teradata_connection, get_saved_connections
 
 # Base mappings
 teradata_to_azure = {
@@ -122,9 +122,6 @@ def run_script_generator_ui():
         else:
             try:
                 if source_db == "Teradata":
-                    connection = get_teradata_connection(selected_conn)
-                    if connection is None:
-                        st.stop()
                     query = f"""
                     SELECT
                         ColumnName,
@@ -135,8 +132,10 @@ def run_script_generator_ui():
                     WHERE DatabaseName = '{schema_name}' AND TableName = '{table_name}'
                     ORDER BY ColumnId;
                     """
-                    metadata_df = pd.read_sql(query, connection)
-                    connection.close()
+                    with teradata_connection(selected_conn) as connection:
+                        if connection is None:
+                            st.stop()
+                        metadata_df = pd.read_sql(query, connection)
                 else:
                     st.error(f"Metadata fetching for {source_db} is not yet implemented, will be added soon :).")
                     st.stop()
@@ -0,0 +1,340 @@
+import base64
+import numpy as np
+import pandas as pd
+from profile_stats import iter_value_blocks
+
+# KLL accuracy parameter: normalized rank error is roughly 1.65 / k
+QUANTILE_SKETCH_K = 200
+
+class QuantileSketch:
+    # Mergeable KLL quantile sketch over float values. Level h holds items of
+    # weight 2**h; a full level is sorted and every other item is promoted.
+    # With exact=True every value is kept, for small data.
+    def __init__(self, k=QUANTILE_SKETCH_K, exact=False, seed=None):
+        self.k = k
+        self.exact = exact
+        self.n = 0
+        self.min = np.inf
+        self.max = -np.inf
+        self.levels = [np.empty(0)]
+        self._chunks = []
+        self._rng = np.random.default_rng(seed)
+
+    def _capacity(self, level: int) -> int:
+        depth = len(self.levels) - 1 - level
+        return max(2, int(np.ceil(self.k * (2 / 3) ** depth)))
+
+    def _compress(self):
+        while sum(len(items) for items in self.levels) > sum(self._capacity(h) for h in range(len(self.levels))):
+            for h, items in enumerate(self.levels):
+                if len(items) < self._capacity(h):
+                    continue
+                if h + 1 == len(self.levels):
+                    self.levels.append(np.empty(0))
+                items = np.sort(items)
+                keep = items[len(items) - len(items) % 2:]
+                promoted = items[self._rng.integers(2):len(items) - len(keep):2]
+                self.levels[h + 1] = np.concatenate([self.levels[h + 1], promoted])
+                self.levels[h] = keep
+                break
+
+    def update(self, values):
+        values = np.asarray(values, dtype=np.float64)
+        values = values[~np.isnan(values)]
+        if not len(values):
+            return self
+        self.n += len(values)
+        self.min = min(self.min, values.min())
+        self.max = max(self.max, values.max())
+        if self.exact:
+            # Kept as separate chunks and concatenated lazily to avoid quadratic copying
+            self._chunks.append(values)
+        else:
+            self.levels[0] = np.concatenate([self.levels[0], values])
+            self._compress()
+        return self
+
+    def _flush_chunks(self):
+        if self._chunks:
+            self.levels[0] = np.concatenate([self.levels[0]] + self._chunks)
+            self._chunks = []
+
+    def merge(self, other):
+        self._flush_chunks()
+        other._flush_chunks()
+        self.n += other.n
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        while len(self.levels) < len(other.levels):
+            self.levels.append(np.empty(0))
+        for h, items in enumerate(other.levels):
+            self.levels[h] = np.concatenate([self.levels[h], items])
+        self.exact = self.exact and other.exact
+        if not self.exact:
+            self._compress()
+        return self
+
+    def weighted_items(self):
+        self._flush_chunks()
+        items = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(len(level), 2.0 ** h) for h, level in enumerate(self.levels)])
+        order = np.argsort(items, kind="stable")
+        return items[order], weights[order]
+
+    def quantiles(self, qs) -> np.ndarray:
+        qs = np.atleast_1d(np.asarray(qs, dtype=np.float64))
+        if not self.n:
+            return np.full(len(qs), np.nan)
+        if self.exact:
+            self._flush_chunks()
+            return np.quantile(self.levels[0], qs)
+        items, weights = self.weighted_items()
+        ranks = np.cumsum(weights) - weights / 2
+        result = np.interp(qs * weights.sum(), ranks, items)
+        # The extremes are tracked exactly
+        result[qs <= 0] = self.min
+        result[qs >= 1] = self.max
+        return result
+
+    # Median absolute deviation from the median, read off the sketch items
+    # (exact in exact mode) so it needs no second pass over the data
+    def median_absolute_deviation(self) -> float:
+        if not self.n:
+            return np.nan
+        median = self.quantiles([0.5])[0]
+        if self.exact:
+            self._flush_chunks()
+            return float(np.median(np.abs(self.levels[0] - median)))
+        items, weights = self.weighted_items()
+        deviations = np.abs(items - median)
+        order = np.argsort(deviations, kind="stable")
+        deviations, weights = deviations[order], weights[order]
+        ranks = np.cumsum(weights) - weights / 2
+        return float(np.interp(0.5 * weights.sum(), ranks, deviations))
+
+    # Mean of |x - median|; the spread the MAD outlier rule falls back to when
+    # more than half the values equal the median and the MAD is 0
+    def mean_absolute_deviation(self) -> float:
+        if not self.n:
+            return np.nan
+        median = self.quantiles([0.5])[0]
+        if self.exact:
+            self._flush_chunks()
+            return float(np.mean(np.abs(self.levels[0] - median)))
+        items, weights = self.weighted_items()
+        return float(np.average(np.abs(items - median), weights=weights))
+
+    def histogram(self, bins=20):
+        if not self.n:
+            return np.zeros(bins), np.linspace(0, 1, bins + 1)
+        items, weights = self.weighted_items()
+        return np.histogram(items, bins=bins, range=(self.min, self.max), weights=weights)
+
+    # Plain (JSON-serializable) state; from_state restores a mergeable sketch
+    def to_state(self) -> dict:
+        self._flush_chunks()
+        return {"k": self.k, "exact": self.exact, "n": self.n, "min": float(self.min), "max": float(self.max),
+                "levels": [level.tolist() for level in self.levels]}
+
+    @classmethod
+    def from_state(cls, state: dict):
+        sketch = cls(state["k"], state["exact"])
+        sketch.n, sketch.min, sketch.max = state["n"], state["min"], state["max"]
+        sketch.levels = [np.asarray(level, dtype=np.float64) for level in state["levels"]]
+        return sketch
+
+class ColumnQuantileSketches:
+    # One QuantileSketch per numeric column, filled in a single block-wise scan
+    def __init__(self, columns, k=QUANTILE_SKETCH_K, exact=False, seed=None):
+        self.columns = list(columns)
+        self.sketches = {col: QuantileSketch(k, exact, seed) for col in self.columns}
+
+    def update(self, df: pd.DataFrame):
+        for values in iter_value_blocks(df, self.columns):
+            self.update_values(values)
+        return self
+
+    # values is a float64 block with one column per sketch, in column order
+    def update_values(self, values: np.ndarray):
+        for i, col in enumerate(self.columns):
+            self.sketches[col].update(values[:, i])
+        return self
+
+    # Side-by-side union of sketches over disjoint columns
+    @classmethod
+    def concat(cls, parts):
+        combined = cls([])
+        for part in parts:
+            combined.columns += part.columns
+            combined.sketches.update(part.sketches)
+        return combined
+
+    def merge(self, other):
+        for col in self.columns:
+            self.sketches[col].merge(other.sketches[col])
+        return self
+
+    # Same shape as DataFrame.quantile(qs): probabilities as index, columns as columns
+    def quantiles(self, qs) -> pd.DataFrame:
+        return pd.DataFrame({col: self.sketches[col].quantiles(qs) for col in self.columns}, index=list(qs))
+
+    def histogram(self, column, bins=20):
+        return self.sketches[column].histogram(bins)
+
+    def median_absolute_deviation(self) -> pd.Series:
+        return pd.Series({col: self.sketches[col].median_absolute_deviation() for col in self.columns}, dtype=np.float64)
+
+    def mean_absolute_deviation(self) -> pd.Series:
+        return pd.Series({col: self.sketches[col].mean_absolute_deviation() for col in self.columns}, dtype=np.float64)
+
+    def to_state(self) -> dict:
+        return {col: self.sketches[col].to_state() for col in self.columns}
+
+    @classmethod
+    def from_state(cls, state: dict):
+        combined = cls([])
+        combined.columns = list(state)
+        combined.sketches = {col: QuantileSketch.from_state(sketch) for col, sketch in state.items()}
+        return combined
+
+# HyperLogLog precision: 2**p registers, standard error about 1.04 / sqrt(2**p)
+HLL_PRECISION = 12
+
+def hash_values(values) -> np.ndarray:
+    # Stable 64-bit hashes of any array-like, vectorized by pandas
+    return pd.util.hash_array(np.asarray(values, dtype=object) if not isinstance(values, np.ndarray) else values)
+
+def _bit_length(values: np.ndarray) -> np.ndarray:
+    # Exact bit length of uint64 values; each 32-bit half is exact in float64
+    hi = (values >> np.uint64(32)).astype(np.float64)
+    lo = (values & np.uint64(0xFFFFFFFF)).astype(np.float64)
+    return np.where(hi > 0, np.frexp(hi)[1] + 32, np.frexp(lo)[1])
+
+class HyperLogLog:
+    # Mergeable approximate distinct counter over 64-bit value hashes
+    def __init__(self, p=HLL_PRECISION):
+        self.p = p
+        self.registers = np.zeros(1 << p, dtype=np.uint8)
+
+    def update_hashes(self, hashes: np.ndarray):
+        hashes = np.asarray(hashes, dtype=np.uint64)
+        index = (hashes >> np.uint64(64 - self.p)).astype(np.intp)
+        remainder = hashes & np.uint64((1 << (64 - self.p)) - 1)
+        rank = (64 - self.p - _bit_length(remainder) + 1).astype(np.uint8)
+        np.maximum.at(self.registers, index, rank)
+        return self
+
+    def update(self, values):
+        values = pd.Series(values).dropna().to_numpy()
+        if len(values):
+            self.update_hashes(hash_values(values))
+        return self
+
+    def merge(self, other):
+        np.maximum(self.registers, other.registers, out=self.registers)
+        return self
+
+    def estimate(self) -> float:
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        raw = alpha * m * m / np.sum(np.exp2(-self.registers.astype(np.float64)))
+        zeros = np.count_nonzero(self.registers == 0)
+        if raw <= 2.5 * m and zeros:
+            # Linear counting is more accurate for small cardinalities
+            return m * np.log(m / zeros)
+        return float(raw)
+
+    def to_state(self) -> dict:
+        return {"p": self.p, "registers": base64.b64encode(self.registers.tobytes()).decode("ascii")}
+
+    @classmethod
+    def from_state(cls, state: dict):
+        hll = cls(state["p"])
+        hll.registers = np.frombuffer(base64.b64decode(state["registers"]), dtype=np.uint8).copy()
+        return hll
+
+# Counters kept by a TopKCounter; values rarer than 1 / (capacity + 1) of the
+# rows may be dropped
+TOP_K_CAPACITY = 100
+
+class TopKCounter:
+    # Mergeable frequent-values summary (Misra-Gries). Each batch is counted
+    # exactly by value_counts and reduced to `capacity` counters, and merged
+    # summaries are reduced the same way. Counts are lower bounds, short by at
+    # most n / (capacity + 1), and every value more frequent than that is kept.
+    def __init__(self, capacity=TOP_K_CAPACITY):
+        self.capacity = capacity
+        self.n = 0
+        self.counts = {}
+
+    def _reduce(self):
+        if len(self.counts) > self.capacity:
+            threshold = sorted(self.counts.values(), reverse=True)[self.capacity]
+            self.counts = {value: count - threshold for value, count in self.counts.items() if count > threshold}
+
+    def update(self, values):
+        counts = pd.Series(values).value_counts()
+        part = TopKCounter(self.capacity)
+        part.n = int(counts.sum())
+        part.counts = dict(zip(counts.index[:self.capacity + 1].tolist(), counts.iloc[:self.capacity + 1].tolist()))
+        if len(counts) > self.capacity:
+            # Subtracting the (capacity + 1)-th count is the exact Misra-Gries reduction
+            part._reduce()
+        return self.merge(part)
+
+    def merge(self, other):
+        for value, count in other.counts.items():
+            self.counts[value] = self.counts.get(value, 0) + count
+        self.n += other.n
+        self._reduce()
+        return self
+
+    # The k most frequent values with their (lower-bound) counts
+    def top(self, k=10) -> list:
+        return sorted(self.counts.items(), key=lambda item: item[1], reverse=True)[:k]
+
+    def to_state(self) -> dict:
+        return {"capacity": self.capacity, "n": self.n, "items": [[value, count] for value, count in self.counts.items()]}
+
+    @classmethod
+    def from_state(cls, state: dict):
+        counter = cls(state["capacity"])
+        counter.n = state["n"]
+        counter.counts = {value: count for value, count in state["items"]}
+        return counter
+
+class DistinctCounter:
+    # Exact distinct count while it stays within `limit`; beyond that either
+    # stop early (approximate=False) or fall back to a HyperLogLog estimate
+    # that has seen every value from the start.
+    def __init__(self, limit=None, approximate=False, p=HLL_PRECISION):
+        self.limit = limit
+        self.seen = set()
+        self.exceeded = False
+        self.hll = HyperLogLog(p) if approximate else None
+
+    # Returns False once further input cannot change the answer
+    def update(self, values) -> bool:
+        values = pd.Series(values).dropna()
+        if self.hll is not None and len(values):
+            self.hll.update_hashes(hash_values(values.to_numpy()))
+        if not self.exceeded:
+            self.seen.update(pd.unique(values.to_numpy()))
+            if self.limit is not None and len(self.seen) > self.limit:
+                self.exceeded = True
+                self.seen = set()
+        return self.hll is not None or not self.exceeded
+
+    def count(self):
+        if not self.exceeded:
+            return len(self.seen)
+        return self.hll.estimate() if self.hll is not None else None
+
+# Distinct non-null values of a series if there are at most `limit`, else None.
+# The series is scanned block by block and the scan stops once the limit is passed.
+def count_distinct_upto(series: pd.Series, limit: int, block_rows=1 << 16):
+    counter = DistinctCounter(limit)
+    for start in range(0, len(series), block_rows):
+        if not counter.update(series.iloc[start:start + block_rows]):
+            break
+    return counter.count()
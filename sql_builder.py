@@ -0,0 +1,103 @@
+# SQL text for the source tables: projections, row limits, sampling and
+# catalog lookups. Kept free of driver and UI imports so the statistics
+# modules that compile queries can be imported without a database client.
+
+# Hash buckets used by deterministic sampling; a fraction f keeps the rows whose
+# hash falls in the first f * HASH_SAMPLE_BUCKETS buckets.
+HASH_SAMPLE_BUCKETS = 10000
+
+# Sample specs are hashable tuples so they can be part of cache keys:
+#   ("rows", n)              ~n random rows
+#   ("fraction", f)          ~f of the rows, 0 < f <= 1
+#   ("hash", f, column)      deterministic f of the rows by hash of column
+def sample_clauses(source_type: str, sample):
+    # Returns (top_rows, from_suffix, where_clause) for the sample spec
+    if not sample:
+        return None, "", ""
+    kind = sample[0]
+    if kind == "rows":
+        rows = int(sample[1])
+        if source_type == "teradata":
+            return None, f" SAMPLE {rows}", ""
+        # TABLESAMPLE picks whole pages, so oversample and trim with TOP
+        return rows, f" TABLESAMPLE ({rows * 2} ROWS)", ""
+    if kind == "fraction":
+        fraction = float(sample[1])
+        if not 0 < fraction <= 1:
+            raise ValueError(f"Sample fraction must be in (0, 1], got {fraction}")
+        if source_type == "teradata":
+            return None, f" SAMPLE {fraction:.6f}", ""
+        return None, f" TABLESAMPLE ({fraction * 100:.4f} PERCENT)", ""
+    if kind == "hash":
+        fraction, column = float(sample[1]), sample[2]
+        if not 0 < fraction <= 1:
+            raise ValueError(f"Sample fraction must be in (0, 1], got {fraction}")
+        buckets = max(1, round(fraction * HASH_SAMPLE_BUCKETS))
+        column = quote_identifier(source_type, column)
+        if source_type == "teradata":
+            expr = f"HASHBUCKET(HASHROW({column})) MOD {HASH_SAMPLE_BUCKETS}"
+        else:
+            expr = f"ABS(CAST(CHECKSUM({column}) AS BIGINT)) % {HASH_SAMPLE_BUCKETS}"
+        return None, "", f" WHERE {expr} < {buckets}"
+    raise ValueError(f"Unknown sample spec: {sample!r}")
+
+def quote_identifier(source_type: str, name: str) -> str:
+    if source_type == "azuresql":
+        return "[" + name.replace("]", "]]") + "]"
+    return '"' + name.replace('"', '""') + '"'
+
+# Build the SELECT issued against a source table. Both Teradata and Azure SQL
+# accept TOP n, so a row limit stops the server from spooling the whole table;
+# Teradata does not allow TOP together with SAMPLE, there the limit is applied
+# while streaming.
+def build_select(table_name: str, source_type=None, columns=None, limit=None, sample=None) -> str:
+    top_rows, from_suffix, where = sample_clauses(source_type, sample)
+    if limit and not (source_type == "teradata" and from_suffix):
+        top_rows = min(top_rows, int(limit)) if top_rows else int(limit)
+    top = f"TOP {top_rows} " if top_rows else ""
+    projection = ", ".join(quote_identifier(source_type, col) for col in columns) if columns else "*"
+    return f"SELECT {top}{projection} FROM {table_name}{from_suffix}{where}"
+
+# Split "db.table" / "schema.table"; a bare name resolves against the session default
+def split_table_name(table_name: str):
+    parts = table_name.strip().split(".", 1)
+    return (parts[0], parts[1]) if len(parts) == 2 else (None, parts[0])
+
+def build_columns_query(source_type: str, table_name: str):
+    schema, table = split_table_name(table_name)
+    if source_type == "teradata":
+        schema_filter = "DatabaseName = ?" if schema else "DatabaseName = DATABASE"
+        query = f"""
+            SELECT TRIM(ColumnName) AS ColumnName, TRIM(ColumnType) AS DataType
+            FROM DBC.ColumnsV
+            WHERE {schema_filter} AND TableName = ?
+            ORDER BY ColumnId
+        """
+    else:
+        schema_filter = "TABLE_SCHEMA = ?" if schema else "TABLE_SCHEMA = SCHEMA_NAME()"
+        query = f"""
+            SELECT COLUMN_NAME AS ColumnName, DATA_TYPE AS DataType
+            FROM INFORMATION_SCHEMA.COLUMNS
+            WHERE {schema_filter} AND TABLE_NAME = ?
+            ORDER BY ORDINAL_POSITION
+        """
+    params = [schema, table] if schema else [table]
+    return query, params
+
+# Base tables of a schema (Teradata database), read from the catalog
+def build_tables_query(source_type: str, schema: str):
+    if source_type == "teradata":
+        query = """
+            SELECT TRIM(TableName) AS TableName
+            FROM DBC.TablesV
+            WHERE DatabaseName = ? AND TableKind IN ('T', 'O')
+            ORDER BY TableName
+        """
+    else:
+        query = """
+            SELECT TABLE_NAME AS TableName
+            FROM INFORMATION_SCHEMA.TABLES
+            WHERE TABLE_SCHEMA = ? AND TABLE_TYPE = 'BASE TABLE'
+            ORDER BY TABLE_NAME
+        """
+    return query, [schema]
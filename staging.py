@@ -0,0 +1,252 @@
+import os
+import shutil
+import tempfile
+import time
+import uuid
+from contextlib import contextmanager
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as pa_ds
+import pyarrow.parquet as pq
+from data_fetch import iter_query_batches, arrow_to_frame, DEFAULT_BATCH_SIZE
+from profile_stats import MomentAccumulator, BLOCK_ROWS
+from sketches import ColumnQuantileSketches
+from column_profiling import profile_numeric_columns
+from outliers import OutlierCounter
+from duplicates import HashPartitions, row_hash_pairs, partitioned_duplicates
+
+# Streamed fetches that grow past this many bytes in memory spill to Parquet
+# on local disk, and the UIs switch to out-of-core queries on the staged file
+STAGING_THRESHOLD_BYTES = 1024 ** 3
+STAGING_DIR = os.path.join(tempfile.gettempdir(), "dua_staging")
+# Rows returned with range violations and duplicate groups of a staged table
+STAGED_SAMPLE_ROWS = 1_000
+# Staged results kept by the result cache, by total file size
+STAGING_DISK_BUDGET = 20 * 1024 ** 3
+# Files older than this in STAGING_DIR are left over from a previous run
+STALE_STAGE_SECONDS = 24 * 60 * 60
+
+# Parquet cannot store all-null columns of unknown type; stage them as strings
+def writable_schema(schema: pa.Schema) -> pa.Schema:
+    return pa.schema([
+        pa.field(field.name, pa.string()) if pa.types.is_null(field.type) else field
+        for field in schema
+    ])
+
+# Remove staged files and hash partition directories left behind by a process
+# that exited without collecting its StagedTables. Only entries untouched for
+# max_age seconds go, so files of other running processes are kept.
+def sweep_stale_stages(max_age=STALE_STAGE_SECONDS) -> int:
+    removed = 0
+    if not os.path.isdir(STAGING_DIR):
+        return removed
+    cutoff = time.time() - max_age
+    for entry in os.scandir(STAGING_DIR):
+        try:
+            if entry.stat().st_mtime > cutoff:
+                continue
+            if entry.is_dir():
+                shutil.rmtree(entry.path)
+            else:
+                os.remove(entry.path)
+            removed += 1
+        except OSError:
+            pass
+    return removed
+
+# pandas dtype of a staged column for row hashing; None keeps the default
+def hash_dtype(arrow_type):
+    if pa.types.is_integer(arrow_type):
+        return pd.Int64Dtype()
+    if pa.types.is_boolean(arrow_type):
+        return pd.BooleanDtype()
+    if pa.types.is_string(arrow_type) or pa.types.is_large_string(arrow_type):
+        return pd.StringDtype("pyarrow")
+    return None
+
+def new_stage_path() -> str:
+    os.makedirs(STAGING_DIR, exist_ok=True)
+    return os.path.join(STAGING_DIR, f"{uuid.uuid4().hex}.parquet")
+
+class StagedTable:
+    # A fetched result kept as a Parquet file on local disk. Every query scans
+    # it in record batches, so memory use is bounded by the batch size and the
+    # (mergeable) result state, not by the table. The file is deleted when the
+    # object is garbage collected, i.e. once no cache entry or session holds it.
+    def __init__(self, path: str):
+        self.path = path
+        self.dataset = pa_ds.dataset(path, format="parquet")
+        self.schema = self.dataset.schema
+        # An Index, as DataFrame.columns, so the UIs can treat both alike
+        self.columns = pd.Index(self.schema.names)
+        self.num_rows = self.dataset.count_rows()
+        # Mirrors DataFrame.attrs so the shared load helpers can inspect it
+        self.attrs = {}
+
+    def __len__(self) -> int:
+        return self.num_rows
+
+    def __del__(self):
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
+
+    @property
+    def nbytes(self) -> int:
+        return os.path.getsize(self.path)
+
+    def iter_frames(self, columns=None, batch_size=BLOCK_ROWS):
+        for batch in self.dataset.to_batches(columns=columns, batch_size=batch_size):
+            yield arrow_to_frame(pa.Table.from_batches([batch]))
+
+    # Frames for row hashing. Integer and boolean columns become nullable
+    # Int64 / boolean, so a value hashes the same in every batch; arrow_to_frame
+    # turns them into float64 / object only in batches that contain a null.
+    def iter_hash_frames(self, columns=None, batch_size=BLOCK_ROWS):
+        for batch in self.dataset.to_batches(columns=columns, batch_size=batch_size):
+            yield batch.to_pandas(types_mapper=hash_dtype)
+
+    def head(self, n=5) -> pd.DataFrame:
+        return arrow_to_frame(self.dataset.head(n))
+
+    def numeric_columns(self) -> list:
+        return [
+            field.name for field in self.schema
+            if pa.types.is_integer(field.type) or pa.types.is_floating(field.type) or pa.types.is_decimal(field.type)
+        ]
+
+    # Moments and approximate quantile sketches, merged across batches
+    def profile_numeric(self, columns):
+        columns = list(columns)
+        moments, sketches = MomentAccumulator(columns), ColumnQuantileSketches(columns)
+        for frame in self.iter_frames(columns):
+            part_moments, part_sketches = profile_numeric_columns(frame, columns)
+            moments.merge(part_moments)
+            sketches.merge(part_sketches)
+        return moments, sketches
+
+    def null_counts(self, columns=None) -> pd.Series:
+        columns = list(columns or self.columns)
+        counts = pd.Series(0, index=columns, dtype=np.int64)
+        for frame in self.iter_frames(columns):
+            counts += frame.isna().sum()
+        return counts
+
+    # 128-bit row hashes spilled to hash partitions in a temporary directory,
+    # so grouping never holds more than one partition of hashes in memory
+    @contextmanager
+    def hash_partitions(self, columns):
+        os.makedirs(STAGING_DIR, exist_ok=True)
+        with tempfile.TemporaryDirectory(dir=STAGING_DIR) as directory:
+            partitions = HashPartitions(directory)
+            try:
+                for frame in self.iter_hash_frames(columns):
+                    partitions.add(row_hash_pairs(frame))
+                yield partitions
+            finally:
+                partitions.close()
+
+    # Number of rows that repeat an earlier row, as len(df) - len(df.drop_duplicates())
+    def duplicate_count(self, subset=None) -> int:
+        with self.hash_partitions(list(subset or self.columns)) as partitions:
+            return partitioned_duplicates(partitions)[0]
+
+    # First row of each duplicated group (key columns only when a subset is
+    # given) with its row count, as duplicates.duplicate_summary reports them;
+    # limited to max_rows groups. Groups are matched on 128-bit row hashes.
+    def duplicate_groups(self, subset=None, max_rows=STAGED_SAMPLE_ROWS) -> pd.DataFrame:
+        columns = list(subset or self.columns)
+        with self.hash_partitions(columns) as partitions:
+            _, repeated = partitioned_duplicates(partitions, max_rows)
+        groups = []
+        if repeated:
+            first_hashes = np.array([h1 for h1, _ in repeated], dtype=np.uint64)
+            for frame, hash_frame in zip(self.iter_frames(columns), self.iter_hash_frames(columns)):
+                pairs = row_hash_pairs(hash_frame)
+                rows, counts = [], []
+                for i in np.flatnonzero(np.isin(pairs[:, 0], first_hashes)):
+                    count = repeated.pop((int(pairs[i, 0]), int(pairs[i, 1])), None)
+                    if count is not None:
+                        rows.append(i)
+                        counts.append(count)
+                if rows:
+                    groups.append(frame.iloc[rows].assign(dup_count=counts))
+                if not repeated:
+                    break
+        if not groups:
+            return pd.DataFrame(columns=columns + ["dup_count"])
+        return pd.concat(groups, ignore_index=True)
+
+    # {column: rows outside [min, max]} with at most max_rows rows per column
+    def range_violations(self, range_rules: dict, max_rows=STAGED_SAMPLE_ROWS) -> dict:
+        columns = [col for col in range_rules if col in self.columns]
+        violations = {col: [] for col in columns}
+        counts = dict.fromkeys(columns, 0)
+        for frame in self.iter_frames(columns):
+            for col in columns:
+                min_val, max_val = range_rules[col]
+                values = pd.to_numeric(frame[col], errors='coerce')
+                invalid = frame.loc[(values < min_val) | (values > max_val), [col]]
+                counts[col] += len(invalid)
+                if sum(map(len, violations[col])) < max_rows:
+                    violations[col].append(invalid)
+        return {
+            col: (pd.concat(violations[col]).head(max_rows).reset_index(drop=True), counts[col])
+            for col in columns if counts[col]
+        }
+
+    # Outlier counts for every method in one scan; bounds from outliers.outlier_bounds.
+    # Sample indices, when requested, are row positions in the staged file.
+    def count_outliers(self, bounds: dict, sample_limit=0) -> OutlierCounter:
+        counter = OutlierCounter(bounds, sample_limit)
+        for frame in self.iter_frames(counter.columns):
+            counter.update_values(frame.to_numpy(dtype=np.float64, na_value=np.nan))
+        return counter
+
+# Stream a query into memory, spilling to a staged Parquet file once the
+# fetched batches exceed threshold_bytes. Returns a DataFrame for results that
+# fit and a StagedTable otherwise.
+def stream_to_stage(source_type: str, conn_name: str, query: str, max_rows=None,
+                    threshold_bytes=STAGING_THRESHOLD_BYTES, batch_size=DEFAULT_BATCH_SIZE, progress=None):
+    held, held_bytes, loaded = [], 0, 0
+    writer = path = None
+    batches = iter_query_batches(source_type, conn_name, query, batch_size, as_arrow=True)
+    try:
+        for batch in batches:
+            if max_rows and loaded + batch.num_rows > max_rows:
+                batch = batch.slice(0, max_rows - loaded)
+            loaded += batch.num_rows
+            if writer is None:
+                held.append(batch)
+                held_bytes += batch.nbytes
+                if held_bytes > threshold_bytes:
+                    path = new_stage_path()
+                    # Typed columns match in every batch; a column whose type is
+                    # inferred from its values takes the type promoted across
+                    # everything held so far, not that of the first batch
+                    schema = pa.unify_schemas([pending.schema for pending in held], promote_options="permissive")
+                    writer = pq.ParquetWriter(path, writable_schema(schema))
+                    for pending in held:
+                        writer.write_batch(pending.cast(writer.schema))
+                    held = []
+            else:
+                writer.write_batch(batch.cast(writer.schema))
+            if progress is not None:
+                target = "local staging file" if writer is not None else "memory"
+                progress.text(f"Loaded {loaded:,} rows into {target}...")
+            if max_rows and loaded >= max_rows:
+                break
+    except BaseException:
+        if writer is not None:
+            writer.close()
+            os.remove(path)
+        raise
+    finally:
+        batches.close()
+    if writer is None:
+        tables = [pa.Table.from_batches([batch]) for batch in held]
+        return arrow_to_frame(pa.concat_tables(tables, promote_options="permissive"))
+    writer.close()
+    return StagedTable(path)
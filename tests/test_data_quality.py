@@ -0,0 +1,44 @@
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+
+# The UI modules import the database drivers through connector
+pytest.importorskip("connector", exc_type=ImportError)
+from streamlit.testing.v1 import AppTest
+
+
+def _check_page(path):
+    import streamlit as st
+    from data_quality import configure_checks
+    from staging import StagedTable
+
+    # Held across reruns, as the result cache holds it; the file goes with the object
+    if "staged" not in st.session_state:
+        st.session_state["staged"] = StagedTable(path)
+    st.session_state["checks"] = configure_checks(st.session_state["staged"])
+
+
+@pytest.fixture
+def staged_path(tmp_path):
+    path = str(tmp_path / "staged.parquet")
+    table = pa.table({"id": [1, 2, 2, None], "amount": [1.5, 2.5, 2.5, 99.0], "name": ["a", "b", "b", None]})
+    pq.write_table(table, path)
+    return path
+
+
+def test_column_pickers_list_staged_columns(staged_path):
+    at = AppTest.from_function(_check_page, args=(staged_path,)).run()
+    assert not at.exception
+    assert [ms.options for ms in at.multiselect] == [["id", "amount", "name"]] * 4
+
+
+def test_column_pickers_return_selection_for_staged_result(staged_path):
+    at = AppTest.from_function(_check_page, args=(staged_path,)).run()
+    at.multiselect[0].select("id").run()
+    at.multiselect[3].select("amount").run()
+    assert not at.exception
+    null_cols, key_cols, expected_types, range_rules = at.session_state["checks"]
+    assert null_cols == ["id"]
+    assert key_cols == []
+    assert expected_types == {}
+    assert range_rules == {"amount": (0.0, 0.0)}
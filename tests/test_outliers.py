@@ -0,0 +1,38 @@
+import numpy as np
+import pandas as pd
+
+from column_profiling import profile_numeric_columns
+from outliers import count_outliers, outlier_bounds
+
+
+def _mad_outliers(df, exact):
+    moments, sketches = profile_numeric_columns(df, list(df.columns), exact=exact)
+    bounds = outlier_bounds(moments, sketches)
+    return bounds["mad"], count_outliers(df, bounds).counts["mad"]
+
+
+def test_mad_falls_back_to_mean_absolute_deviation_when_mad_is_zero():
+    rng = np.random.default_rng(0)
+    values = np.concatenate([np.zeros(6000), rng.normal(0, 1, 3990), [50.0] * 10])
+    df = pd.DataFrame({"x": rng.permutation(values)})
+    for exact in (True, False):
+        bounds, counts = _mad_outliers(df, exact)
+        assert bounds.loc["x", "high"] > 0
+        # The planted extremes and the normal tail, not all 4000 non-median values
+        assert 10 <= counts[0] < 1000
+
+
+def test_constant_column_has_no_mad_outliers():
+    df = pd.DataFrame({"x": np.full(1000, 7.0)})
+    _, counts = _mad_outliers(df, exact=True)
+    assert counts[0] == 0
+
+
+def test_mad_bounds_unchanged_when_mad_is_positive():
+    rng = np.random.default_rng(1)
+    x = rng.normal(10, 2, 20000)
+    df = pd.DataFrame({"x": x})
+    bounds, _ = _mad_outliers(df, exact=True)
+    median = np.median(x)
+    mad = np.median(np.abs(x - median))
+    assert np.isclose(bounds.loc["x", "high"], median + 3.5 * mad / 0.6745)
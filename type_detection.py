@@ -0,0 +1,162 @@
+from functools import partial
+import numpy as np
+import pandas as pd
+from sketches import count_distinct_upto
+from result_cache import LRUCache
+
+try:
+    from pandas.tseries.api import guess_datetime_format
+except ImportError:  # pandas < 2.2
+    from pandas._libs.tslibs.parsing import guess_datetime_format
+
+# Rows of each object column inspected when building a conversion plan
+DETECTION_SAMPLE_ROWS = 10_000
+# Object columns with at most this many distinct values become categories
+CATEGORY_MAX_UNIQUE = 20
+
+BOOLEAN_TOKENS = {'yes', 'no', 'true', 'false', '0', '1'}
+TRUE_TOKENS = ['yes', 'true', '1']
+SYMBOL_PATTERN = r'[$%,]'
+
+# Values inspected when inferring a datetime format, and the share of them
+# that must parse with the inferred format for a column to count as a date
+DATE_SAMPLE_ROWS = 200
+DATE_PARSE_MIN_RATIO = 0.95
+
+# Inferred datetime formats keyed by (source, column); module state survives reruns
+_datetime_formats = LRUCache(max_entries=10_000)
+
+CONVERSION_LABELS = {
+    "datetime": "Converted to datetime",
+    "boolean": "Converted to boolean",
+    "category": "Converted to category",
+    "symbolic_numeric": "Parsed numeric values with symbols",
+}
+
+# Includes string categoricals, which the load-time dtype optimizer produces
+def is_text_column(series: pd.Series) -> bool:
+    dtype = series.dtype
+    if isinstance(dtype, pd.CategoricalDtype):
+        dtype = dtype.categories.dtype
+    return dtype == 'object' or isinstance(dtype, pd.StringDtype)
+
+# Signals for one object column, computed from a bounded sample
+def column_signals(series: pd.Series, sample_rows=DETECTION_SAMPLE_ROWS) -> dict:
+    sample = series.iloc[:sample_rows].dropna()
+    tokens = sample.astype(str).str.lower()
+    unique_tokens = set(tokens.unique())
+    return {
+        "boolean_tokens": bool(unique_tokens) and unique_tokens.issubset(BOOLEAN_TOKENS),
+        "sample_unique": sample.nunique(),
+        "has_symbols": bool(tokens.head(10).str.contains(SYMBOL_PATTERN, regex=True).any()),
+    }
+
+def _parse_ratio(values: pd.Series, fmt: str) -> float:
+    return pd.to_datetime(values, format=fmt, errors='coerce').notna().mean()
+
+# Explicit strftime format that parses the sample, or None
+def infer_datetime_format(sample: pd.Series):
+    values = sample.dropna()
+    if values.empty or not values.map(type).eq(str).all():
+        return None
+    values = values.str.strip()
+    values = values[values != ""].head(DATE_SAMPLE_ROWS)
+    # Bare digit strings are ids or amounts far more often than %Y%m%d dates
+    if values.empty or values.str.fullmatch(r"\d+").all():
+        return None
+    guesses = values.head(20).map(guess_datetime_format).dropna()
+    for fmt in guesses.value_counts().index:
+        if _parse_ratio(values, fmt) >= DATE_PARSE_MIN_RATIO:
+            return fmt
+    return None
+
+# Format for a column, reusing the cached format for (source, column) when it
+# still parses the sample so repeated loads skip inference
+def datetime_format_for(series: pd.Series, source=None, column=None):
+    sample = series.iloc[:DATE_SAMPLE_ROWS * 5].dropna().head(DATE_SAMPLE_ROWS)
+    key = (source, column)
+    if source is not None:
+        cached = _datetime_formats.get(key)
+        if cached is not None and _parse_ratio(sample.astype(str).str.strip(), cached) >= DATE_PARSE_MIN_RATIO:
+            return cached
+    fmt = infer_datetime_format(sample)
+    if fmt is not None and source is not None:
+        _datetime_formats.put(key, fmt)
+    return fmt
+
+# At most CATEGORY_MAX_UNIQUE distinct values; from the scanned counter when
+# there is one, else counted with an early exit past the limit
+def is_low_cardinality(series: pd.Series, counter=None) -> bool:
+    if counter is not None and counter.limit == CATEGORY_MAX_UNIQUE:
+        return not counter.exceeded
+    return count_distinct_upto(series, CATEGORY_MAX_UNIQUE) is not None
+
+# One detection pass over the columns; returns {column: (conversion kind, option)}
+# where the option is the explicit format for datetime conversions. Columns
+# named like dates are always converted; other text columns are converted when
+# their content parses with an inferred format. Sample-based candidates for
+# boolean and category are confirmed against the full column with a single
+# vectorized check before they enter the plan. distinct: optional
+# {column: sketches.DistinctCounter} with a limit of CATEGORY_MAX_UNIQUE, from
+# a profiling scan that already covered the columns.
+def plan_conversions(df: pd.DataFrame, sample_rows=DETECTION_SAMPLE_ROWS, source=None, distinct=None) -> dict:
+    plan = {}
+    for col in df.columns:
+        series = df[col]
+        if pd.api.types.is_datetime64_any_dtype(series):
+            continue
+        if "date" in str(col).lower():
+            plan[col] = ("datetime", datetime_format_for(series, source, col) if is_text_column(series) else None)
+            continue
+        if not is_text_column(series):
+            continue
+        signals = column_signals(series, sample_rows)
+        if signals["boolean_tokens"] and series.dropna().astype(str).str.lower().isin(BOOLEAN_TOKENS).all():
+            plan[col] = ("boolean", None)
+            continue
+        fmt = datetime_format_for(series, source, col)
+        if fmt is not None:
+            plan[col] = ("datetime", fmt)
+        elif signals["sample_unique"] <= CATEGORY_MAX_UNIQUE and is_low_cardinality(series, (distinct or {}).get(col)):
+            plan[col] = ("category", None)
+        elif signals["has_symbols"]:
+            plan[col] = ("symbolic_numeric", None)
+    return plan
+
+# Convert each distinct value once and broadcast back through the factorized
+# codes; string parsing then costs O(distinct values) instead of O(rows)
+def convert_distinct(series: pd.Series, convert, missing) -> np.ndarray:
+    codes, uniques = pd.factorize(series)
+    converted = np.asarray(convert(pd.Series(uniques, dtype=object)))
+    converted = np.append(converted, np.array([missing], dtype=converted.dtype))
+    return converted[codes]
+
+def _parse_boolean(values: pd.Series):
+    return values.astype(str).str.strip().str.lower().isin(TRUE_TOKENS).to_numpy()
+
+def _parse_datetime(values: pd.Series, fmt=None):
+    return pd.to_datetime(values, format=fmt, errors='coerce').to_numpy()
+
+def _parse_symbolic_numeric(values: pd.Series):
+    return pd.to_numeric(values.astype(str).str.replace(SYMBOL_PATTERN, '', regex=True), errors='coerce').to_numpy(dtype=np.float64)
+
+# Apply a conversion plan in place with vectorized operations; returns the
+# conversion summary shown by the profiling UI
+def apply_conversions(df: pd.DataFrame, plan: dict) -> dict:
+    summary = {}
+    for col, (kind, option) in plan.items():
+        if kind == "datetime":
+            # An explicit format parses in one vectorized pass instead of per element
+            if isinstance(df[col].dtype, pd.CategoricalDtype):
+                # to_datetime would keep the categorical wrapper; parse the categories instead
+                df[col] = convert_distinct(df[col], partial(_parse_datetime, fmt=option), np.datetime64('NaT'))
+            else:
+                df[col] = pd.to_datetime(df[col], format=option, errors='coerce')
+        elif kind == "boolean":
+            df[col] = convert_distinct(df[col], _parse_boolean, False)
+        elif kind == "category":
+            df[col] = df[col].astype('category')
+        elif kind == "symbolic_numeric":
+            df[col] = convert_distinct(df[col], _parse_symbolic_numeric, np.nan)
+        summary[col] = CONVERSION_LABELS[kind]
+    return summary